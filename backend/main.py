@@ -1,31 +1,67 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import FileResponse, HTMLResponse, ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
 from typing import List, Optional, Dict, Any
+from anyio import to_thread
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
-import json
+import mmap
+import orjson
+import os
+import pickle
+import time
 import redis
+import redis.asyncio as aredis
 from rq import Queue
 from rq.job import Job
 
 from .settings import CORS_ALLOW_ORIGINS, REDIS_URL, RQ_QUEUE_NAME, EXPORT_BASE
 from .tasks import run_scrape_job
+from .utils import new_task_id
 
-app = FastAPI(title="B2B Lead Scraper API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync handlers and run_in_threadpool calls share anyio's default pool
+    # (40 tokens); raise it so heavy polling can't exhaust worker threads.
+    to_thread.current_default_thread_limiter().total_tokens = int(
+        os.environ.get("API_THREADPOOL_TOKENS", "200"))
+    # Async pool for status polling; RQ itself stays on the sync connection.
+    app.state.redis_pool = aredis.ConnectionPool.from_url(REDIS_URL, max_connections=64)
+    app.state.redis = aredis.Redis(connection_pool=app.state.redis_pool)
+    yield
+    await app.state.redis.aclose()
+    await app.state.redis_pool.disconnect()
+
+app = FastAPI(title="B2B Lead Scraper API", version="1.0.0", lifespan=lifespan,
+              default_response_class=ORJSONResponse)
+
+# Computed once; explicit methods/headers let Starlette precompute the
+# preflight response instead of taking its wildcard branch per OPTIONS.
+_ORIGINS = tuple(o.strip() for o in CORS_ALLOW_ORIGINS if o.strip())
+_METHODS = ("GET", "POST", "OPTIONS")
+_HEADERS = ("Content-Type", "Authorization")
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[o.strip() for o in CORS_ALLOW_ORIGINS],
+    allow_origins=_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=_METHODS,
+    allow_headers=_HEADERS,
 )
 
-rconn = redis.from_url(REDIS_URL)
+# Bounded shared pool (the from_url default is effectively unbounded).
+# redis-py picks the C hiredis RESP parser automatically when installed.
+rpool = redis.ConnectionPool.from_url(
+    REDIS_URL, max_connections=32, socket_keepalive=True, socket_timeout=5)
+rconn = redis.Redis(connection_pool=rpool)
 queue = Queue(RQ_QUEUE_NAME, connection=rconn)
 
 class StartPayload(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
     keywords: List[str] = Field(..., min_items=1)
     locations: List[str] = Field(..., min_items=1)
     industry: Optional[str] = ""
@@ -34,27 +70,140 @@ class StartPayload(BaseModel):
     max_runtime_min: Optional[int] = Field(15, ge=1, le=120)
     workers: Optional[int] = Field(24, ge=1, le=64)
 
+# Validating the raw body through a prebuilt TypeAdapter uses
+# pydantic-core's JSON path directly, skipping FastAPI's per-request
+# dependency machinery for this fixed schema.
+_PAYLOAD_ADAPTER = TypeAdapter(StartPayload)
+
+def _parse_payload(raw: bytes) -> StartPayload:
+    try:
+        return _PAYLOAD_ADAPTER.validate_json(raw)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+
+# Task ids are 32 lowercase hex chars; rejecting anything else up front
+# avoids Redis/filesystem work (and path traversal) for junk ids.
+_HEX_DIGITS = frozenset("0123456789abcdef")
+
+def _require_task_id(task_id: str) -> None:
+    if len(task_id) != 32 or not _HEX_DIGITS.issuperset(task_id):
+        raise HTTPException(status_code=400, detail="bad task_id")
+
+# Static UI never changes at runtime; read it once at import time.
+INDEX_HTML = (Path(__file__).parent / "static" / "index.html").read_bytes()
+
 @app.get("/", response_class=HTMLResponse)
 def index():
-    html = (Path(__file__).parent / "static" / "index.html").read_text(encoding="utf-8")
-    return HTMLResponse(content=html, status_code=200)
+    return HTMLResponse(content=INDEX_HTML, status_code=200)
 
 @app.post("/start-scrape")
-def start_scrape(p: StartPayload):
-    job = queue.enqueue(run_scrape_job, p.dict(), job_timeout=60*60*2)
-    return {"task_id": job.get_id(), "status": "queued"}
+async def start_scrape(request: Request):
+    p = _parse_payload(await request.body())
+    # RQ is sync-only; keep its Redis I/O off the event loop.
+    job = await run_in_threadpool(queue.enqueue, run_scrape_job, p.model_dump(),
+                                  job_timeout=60*60*2, job_id=new_task_id())
+    # Same shape as scrape-status so the client can render without an
+    # immediate follow-up poll.
+    return {"task_id": job.get_id(), "status": "queued", "phase": "queued",
+            "progress": "", "outputs": {}}
+
+def _fetch_jobs_pipelined(task_ids: List[str]) -> List[Dict[str, Any]]:
+    # One pipelined round trip instead of a Job.fetch (several commands) per id.
+    pipe = rconn.pipeline(transaction=False)
+    for tid in task_ids:
+        pipe.hgetall(f"rq:job:{tid}")
+    raws = pipe.execute()
+    out: List[Dict[str, Any]] = []
+    for tid, raw in zip(task_ids, raws):
+        if not raw:
+            out.append({"task_id": tid, "status": "unknown"})
+            continue
+        meta: Dict[str, Any] = {}
+        if raw.get(b"meta"):
+            try:
+                meta = pickle.loads(raw[b"meta"]) or {}
+            except Exception:
+                meta = {}
+        out.append({
+            "task_id": tid,
+            "status": (raw.get(b"status") or b"").decode("utf-8", "ignore"),
+            "phase": meta.get("phase", ""),
+            "progress": meta.get("progress", ""),
+            "outputs": meta.get("outputs", {}),
+        })
+    return out
+
+@app.get("/scrape-status")
+async def scrape_status_batch(ids: str = ""):
+    task_ids = [t.strip() for t in ids.split(",") if t.strip()]
+    for tid in task_ids:
+        _require_task_id(tid)
+    if not task_ids:
+        raise HTTPException(status_code=400, detail="ids query param required")
+    return {"tasks": await run_in_threadpool(_fetch_jobs_pipelined, task_ids)}
+
+# Workers publish progress on scrape:{task_id}; streaming it over SSE replaces
+# the 1-Hz poll loop (N clients -> N idle subscriptions instead of N req/s).
+_SSE_KEEPALIVE_SEC = 15.0
+_SSE_TERMINAL_PHASES = ("completed", "failed")
+
+@app.get("/scrape-events/{task_id}")
+async def scrape_events(task_id: str, request: Request):
+    _require_task_id(task_id)
+
+    async def event_source():
+        pubsub = app.state.redis.pubsub()
+        await pubsub.subscribe(f"scrape:{task_id}")
+        try:
+            while not await request.is_disconnected():
+                msg = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=_SSE_KEEPALIVE_SEC)
+                if msg is None:
+                    # Comment line keeps proxies from timing out the stream.
+                    yield b": keepalive\n\n"
+                    continue
+                data = msg["data"]
+                if isinstance(data, str):
+                    data = data.encode("utf-8")
+                yield b"data: " + data + b"\n\n"
+                try:
+                    if orjson.loads(data).get("phase") in _SSE_TERMINAL_PHASES:
+                        break
+                except Exception:
+                    pass
+        finally:
+            await pubsub.unsubscribe(f"scrape:{task_id}")
+            await pubsub.aclose()
+
+    return StreamingResponse(event_source(), media_type="text/event-stream")
+
+# Absorbs polling storms: repeated polls inside the TTL window reuse the last
+# snapshot instead of re-fetching and unpickling the RQ job hash.
+_JOB_CACHE: Dict[str, tuple] = {}
+_JOB_CACHE_TTL = 0.75
+_JOB_CACHE_TTL_TERMINAL = 30.0
+_TERMINAL_STATUSES = ("finished", "failed", "completed")
 
 @app.get("/scrape-status/{task_id}")
-def scrape_status(task_id: str):
+async def scrape_status(task_id: str, fresh: bool = False):
+    _require_task_id(task_id)
+    now = time.monotonic()
+    if not fresh:
+        hit = _JOB_CACHE.get(task_id)
+        if hit:
+            ttl = _JOB_CACHE_TTL_TERMINAL if hit[1].get("status") in _TERMINAL_STATUSES else _JOB_CACHE_TTL
+            if now - hit[0] < ttl:
+                return hit[1]
+
     try:
-        job = Job.fetch(task_id, connection=rconn)
+        job = await run_in_threadpool(Job.fetch, task_id, connection=rconn)
     except Exception:
-        manifest = _read_manifest(task_id)
-        if manifest:
-            return {"task_id": task_id, "status": "completed", "result": manifest}
+        resp = _manifest_response(task_id)
+        if resp is not None:
+            return resp
         raise HTTPException(status_code=404, detail="task_id not found")
 
-    status = job.get_status()
+    status = await run_in_threadpool(job.get_status)
     meta = job.meta or {}
     out = {
         "task_id": task_id,
@@ -65,31 +214,77 @@ def scrape_status(task_id: str):
     }
     if status == "finished":
         try:
-            out["result"] = job.return_value()
+            out["result"] = await run_in_threadpool(job.return_value)
         except Exception:
             pass
+    if len(_JOB_CACHE) > 2048:
+        _JOB_CACHE.clear()
+    _JOB_CACHE[task_id] = (now, out)
     return out
 
+# Paths are built as plain strings on the hot download routes; Path.__truediv__
+# allocates and normalizes a new PurePath per segment.
+EXPORT_BASE_STR = str(EXPORT_BASE)
+
+# Short-TTL stat cache so ready-polling loops don't stat() on every request.
+_FILE_META: Dict[str, tuple] = {}
+_FILE_META_TTL = 2.0
+
+def _stat_cached(path: str) -> Optional[os.stat_result]:
+    hit = _FILE_META.get(path)
+    now = time.monotonic()
+    if hit and now - hit[1] < _FILE_META_TTL:
+        return hit[0]
+    try:
+        st = os.stat(path)
+    except OSError:
+        st = None
+    _FILE_META[path] = (st, now)
+    return st
+
 @app.get("/download/csv/{task_id}")
 def download_csv(task_id: str):
-    csv_path = EXPORT_BASE / task_id / "output.csv"
-    if not csv_path.exists():
+    _require_task_id(task_id)
+    csv_path = f"{EXPORT_BASE_STR}/{task_id}/output.csv"
+    st = _stat_cached(csv_path)
+    if st is None:
         raise HTTPException(status_code=404, detail="CSV not ready")
-    return FileResponse(csv_path, filename="output.csv", media_type="text/csv")
+    return FileResponse(csv_path, filename="output.csv", media_type="text/csv", stat_result=st)
 
 @app.get("/download/excel/{task_id}")
 def download_excel(task_id: str):
-    xlsx_path = EXPORT_BASE / task_id / "output.xlsx"
-    if not xlsx_path.exists():
+    _require_task_id(task_id)
+    xlsx_path = f"{EXPORT_BASE_STR}/{task_id}/output.xlsx"
+    st = _stat_cached(xlsx_path)
+    if st is None:
         raise HTTPException(status_code=404, detail="Excel not ready")
     return FileResponse(xlsx_path, filename="output.xlsx",
-                        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        stat_result=st)
 
-def _read_manifest(task_id: str) -> Optional[Dict[str, Any]]:
-    m = EXPORT_BASE / task_id / "manifest.json"
-    if m.exists():
-        try:
-            return json.loads(m.read_text(encoding="utf-8"))
-        except Exception:
-            return None
-    return None
+@lru_cache(maxsize=512)
+def _manifest_body(task_id: str, path_str: str, mtime_ns: int) -> bytes:
+    # The manifest is already JSON on disk; splice it into the response
+    # envelope as raw bytes instead of parse + re-serialize on every poll.
+    # mtime_ns keys the cache so a rewritten manifest invalidates naturally.
+    with open(path_str, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            raw = bytes(mm)
+    # one validating parse per mtime (amortized by the cache): a corrupt or
+    # torn manifest raises here and the caller 404s instead of splicing
+    # invalid JSON into a 200
+    orjson.loads(raw)
+    return (orjson.dumps({"task_id": task_id, "status": "completed"})[:-1]
+            + b',"result":' + raw + b"}")
+
+def _manifest_response(task_id: str) -> Optional[Response]:
+    m = f"{EXPORT_BASE_STR}/{task_id}/manifest.json"
+    try:
+        st = os.stat(m)
+    except OSError:
+        return None
+    try:
+        body = _manifest_body(task_id, m, st.st_mtime_ns)
+    except Exception:
+        return None
+    return Response(content=body, media_type="application/json")
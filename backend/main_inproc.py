@@ -1,30 +1,99 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import FileResponse, HTMLResponse, ORJSONResponse, Response
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
 from typing import List, Optional, Dict, Any
+from anyio import to_thread
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
-import uuid
-from concurrent.futures import ThreadPoolExecutor
+import mmap
+import orjson
+import os
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 from .settings import CORS_ALLOW_ORIGINS, EXPORT_BASE
-from .tasks_inproc import run_scrape_job_inproc
+from .tasks_inproc import run_scrape_job_proc
+from .utils import new_task_id
 
-app = FastAPI(title="B2B Lead Scraper API (in-process)", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # All handlers here are sync def and share anyio's default pool
+    # (40 tokens); raise it so heavy polling can't exhaust worker threads.
+    to_thread.current_default_thread_limiter().total_tokens = int(
+        os.environ.get("API_THREADPOOL_TOKENS", "200"))
+    yield
+
+app = FastAPI(title="B2B Lead Scraper API (in-process)", version="1.0.0",
+              lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Computed once; explicit methods/headers let Starlette precompute the
+# preflight response instead of taking its wildcard branch per OPTIONS.
+_ORIGINS = tuple(o.strip() for o in CORS_ALLOW_ORIGINS if o.strip())
+_METHODS = ("GET", "POST", "OPTIONS")
+_HEADERS = ("Content-Type", "Authorization")
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[o.strip() for o in CORS_ALLOW_ORIGINS],
+    allow_origins=_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=_METHODS,
+    allow_headers=_HEADERS,
 )
 
-# In-memory task registry
-TASKS: Dict[str, Dict[str, Any]] = {}
-EXECUTOR = ThreadPoolExecutor(max_workers=2)
+class Task:
+    """Lock-protected status record for one in-process scrape.
+
+    Live progress comes from a Manager dict proxy written by the scraper
+    process; terminal state (result/error) is set locally by the parent's
+    done-callback and wins over the proxy in snapshots.
+    """
+    __slots__ = ("shared", "state", "finished_at", "_lock")
+
+    def __init__(self, shared):
+        self.shared = shared
+        self.state: Dict[str, Any] = {}
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def update(self, **kv: Any) -> None:
+        with self._lock:
+            self.state.update(kv)
+            if kv.get("status") in ("finished", "failed"):
+                self.finished_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = {"status": "queued", "phase": "queued", "progress": "", "outputs": {}}
+            try:
+                out.update(dict(self.shared))
+            except Exception:
+                pass
+            out.update(self.state)
+            return out
+
+# In-memory task registry (records are updated from scraper processes)
+TASKS: Dict[str, Task] = {}
+TASK_TTL_SEC = int(os.environ.get("INPROC_TASK_TTL_MIN", "60")) * 60
+MAX_INPROC = int(os.environ.get("INPROC_MAX", "0") or 0) or (os.cpu_count() or 2)
+# Scrapes run in worker processes so their parsing work doesn't contend
+# with request handlers for the GIL.
+_MANAGER = multiprocessing.Manager()
+EXECUTOR = ProcessPoolExecutor(max_workers=MAX_INPROC)
+
+def _expire_tasks() -> None:
+    # Drop finished/failed records after TASK_TTL_SEC; manifests cover history.
+    now = time.monotonic()
+    for tid, t in list(TASKS.items()):
+        if t.finished_at is not None and now - t.finished_at > TASK_TTL_SEC:
+            TASKS.pop(tid, None)
 
 class StartPayload(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
     keywords: List[str] = Field(..., min_items=1)
     locations: List[str] = Field(..., min_items=1)
     industry: Optional[str] = ""
@@ -33,71 +102,134 @@ class StartPayload(BaseModel):
     max_runtime_min: Optional[int] = Field(20, ge=1, le=120)
     workers: Optional[int] = Field(16, ge=1, le=64)
 
+# Validating the raw body through a prebuilt TypeAdapter uses
+# pydantic-core's JSON path directly, skipping FastAPI's per-request
+# dependency machinery for this fixed schema.
+_PAYLOAD_ADAPTER = TypeAdapter(StartPayload)
+
+def _parse_payload(raw: bytes) -> StartPayload:
+    try:
+        return _PAYLOAD_ADAPTER.validate_json(raw)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+
+# Task ids are 32 lowercase hex chars; rejecting anything else up front
+# avoids Redis/filesystem work (and path traversal) for junk ids.
+_HEX_DIGITS = frozenset("0123456789abcdef")
+
+def _require_task_id(task_id: str) -> None:
+    if len(task_id) != 32 or not _HEX_DIGITS.issuperset(task_id):
+        raise HTTPException(status_code=400, detail="bad task_id")
+
+# Static UI never changes at runtime; read it once at import time.
+INDEX_HTML = (Path(__file__).parent / "static" / "index.html").read_bytes()
+
 @app.get("/", response_class=HTMLResponse)
 def index():
-    html = (Path(__file__).parent / "static" / "index.html").read_text(encoding="utf-8")
-    return HTMLResponse(content=html, status_code=200)
+    return HTMLResponse(content=INDEX_HTML, status_code=200)
 
 @app.post("/start-scrape")
-def start_scrape(p: StartPayload):
-    task_id = uuid.uuid4().hex
-    TASKS[task_id] = {"status":"queued", "phase":"queued", "progress":"", "outputs":{}}
+async def start_scrape(request: Request):
+    p = _parse_payload(await request.body())
+    _expire_tasks()
+    task_id = new_task_id()
+    shared = _MANAGER.dict({"status": "queued", "phase": "queued", "progress": "", "outputs": {}})
+    task = Task(shared)
+    TASKS[task_id] = task
 
-    def progress_cb(phase: str, progress: str):
-        t = TASKS.get(task_id)
-        if t:
-            t.update({"status": phase, "phase": phase, "progress": progress})
+    fut = EXECUTOR.submit(run_scrape_job_proc, task_id, p.model_dump(), shared)
 
-    def run():
+    def _on_done(f):
         try:
-            TASKS[task_id].update({"status":"running", "phase":"running"})
-            result = run_scrape_job_inproc(task_id, p.dict(), progress_cb=progress_cb)
-            TASKS[task_id].update({
-                "status":"finished",
-                "phase":"completed",
-                "outputs": result.get("outputs", {}),
-                "result": result
-            })
+            result = f.result()
+            task.update(
+                status="finished",
+                phase="completed",
+                outputs=result.get("outputs", {}),
+                result=result,
+            )
         except Exception as e:
-            TASKS[task_id].update({"status":"failed", "phase":"failed", "error": str(e)})
+            task.update(status="failed", phase="failed", error=str(e))
 
-    EXECUTOR.submit(run)
-    return {"task_id": task_id, "status": "queued"}
+    fut.add_done_callback(_on_done)
+    # Same shape as scrape-status so the client can render without an
+    # immediate follow-up poll.
+    return {"task_id": task_id, **task.snapshot()}
 
 @app.get("/scrape-status/{task_id}")
 def scrape_status(task_id: str):
+    _require_task_id(task_id)
     t = TASKS.get(task_id)
     if not t:
-        m = _read_manifest(task_id)
-        if m:
-            return {"task_id": task_id, "status": "completed", "result": m, "outputs": m.get("outputs", {})}
+        resp = _manifest_response(task_id)
+        if resp is not None:
+            return resp
         raise HTTPException(status_code=404, detail="task_id not found")
-    return {"task_id": task_id, **t}
+    return {"task_id": task_id, **t.snapshot()}
+
+# Paths are built as plain strings on the hot download routes; Path.__truediv__
+# allocates and normalizes a new PurePath per segment.
+EXPORT_BASE_STR = str(EXPORT_BASE)
+
+# Short-TTL stat cache so ready-polling loops don't stat() on every request.
+_FILE_META: Dict[str, tuple] = {}
+_FILE_META_TTL = 2.0
+
+def _stat_cached(path: str) -> Optional[os.stat_result]:
+    hit = _FILE_META.get(path)
+    now = time.monotonic()
+    if hit and now - hit[1] < _FILE_META_TTL:
+        return hit[0]
+    try:
+        st = os.stat(path)
+    except OSError:
+        st = None
+    _FILE_META[path] = (st, now)
+    return st
 
 @app.get("/download/csv/{task_id}")
 def download_csv(task_id: str):
-    p = EXPORT_BASE / task_id / "output.csv"
-    if not p.exists():
+    _require_task_id(task_id)
+    p = f"{EXPORT_BASE_STR}/{task_id}/output.csv"
+    st = _stat_cached(p)
+    if st is None:
         raise HTTPException(status_code=404, detail="CSV not ready")
-    return FileResponse(p, filename="output.csv", media_type="text/csv")
+    return FileResponse(p, filename="output.csv", media_type="text/csv", stat_result=st)
 
 @app.get("/download/excel/{task_id}")
 def download_excel(task_id: str):
-    p = EXPORT_BASE / task_id / "output.xlsx"
-    if not p.exists():
+    _require_task_id(task_id)
+    p = f"{EXPORT_BASE_STR}/{task_id}/output.xlsx"
+    st = _stat_cached(p)
+    if st is None:
         raise HTTPException(status_code=404, detail="Excel not ready")
     return FileResponse(
         p,
         filename="output.xlsx",
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        stat_result=st,
     )
 
-def _read_manifest(task_id: str) -> Optional[Dict[str, Any]]:
-    m = EXPORT_BASE / task_id / "manifest.json"
-    if m.exists():
-        import json
-        try:
-            return json.loads(m.read_text(encoding="utf-8"))
-        except Exception:
-            return None
-    return None
+@lru_cache(maxsize=512)
+def _manifest_body(task_id: str, path_str: str, mtime_ns: int) -> bytes:
+    # The manifest is already JSON on disk; splice it into the response
+    # envelope as raw bytes instead of parse + re-serialize on every poll.
+    # mtime_ns keys the cache so a rewritten manifest invalidates naturally.
+    with open(path_str, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            raw = bytes(mm)
+    outputs = orjson.loads(raw).get("outputs", {})
+    return (orjson.dumps({"task_id": task_id, "status": "completed", "outputs": outputs})[:-1]
+            + b',"result":' + raw + b"}")
+
+def _manifest_response(task_id: str) -> Optional[Response]:
+    m = f"{EXPORT_BASE_STR}/{task_id}/manifest.json"
+    try:
+        st = os.stat(m)
+    except OSError:
+        return None
+    try:
+        body = _manifest_body(task_id, m, st.st_mtime_ns)
+    except Exception:
+        return None
+    return Response(content=body, media_type="application/json")
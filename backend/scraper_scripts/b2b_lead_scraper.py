@@ -14,10 +14,10 @@ Async, directory-safe B2B scraper for India (can be made generic with SCRAPER_ST
 """
 
 import os, re, csv, json, sys, time, math, logging, asyncio, urllib.parse, sqlite3, random, uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from typing import Dict, Optional, List, Tuple, Any, Set
 from functools import lru_cache
-from difflib import SequenceMatcher
 from html import unescape
 
 try:
@@ -25,6 +25,25 @@ try:
 except ImportError:
     print("Please install aiohttp: pip install aiohttp", file=sys.stderr); sys.exit(1)
 
+try:
+    from selectolax.parser import HTMLParser as _HTMLParser  # C HTML parser, optional
+except ImportError:
+    _HTMLParser = None
+
+# SERP responses can be tens of KB; orjson parses bytes directly (no decode
+# pass) several times faster than the stdlib when available.
+try:
+    import orjson
+    def _loads_bytes(b: bytes) -> Any: return orjson.loads(b)
+except ImportError:
+    def _loads_bytes(b: bytes) -> Any: return json.loads(b.decode("utf-8","ignore"))
+
+# Hot string helpers live in utils_fast (mypyc-compilable, shared by both
+# scraper variants).
+from utils_fast import (FREE_MAIL, TITLE_SPLIT_RE, domain_of, etld1, fuzzy_sim,
+                        fuzzy_sim_norm, is_valid_email, is_valid_url,
+                        norm_text, rank_email, title_head)
+
 APP_NAME = "b2b_lead_scraper_async"
 
 # ---------------------------- Env loader ----------------------------
@@ -45,6 +64,7 @@ _load_env(os.path.join(os.path.dirname(BASE_DIR), ".env"))
 
 # ---------------------------- Config ----------------------------
 DEFAULT_TIMEOUT = int(os.environ.get("HTTP_TIMEOUT", "12"))
+MAX_FETCH_BYTES = int(os.environ.get("SCRAPER_MAX_FETCH_BYTES", str(256*1024)))
 MIN_REQUEST_INTERVAL = float(os.environ.get("SCRAPER_RATE", "0.6"))
 MAX_WORKERS = int(os.environ.get("SCRAPER_WORKERS", "24"))
 CSV_MAX_ROWS = 100000
@@ -85,20 +105,24 @@ SERP_NEVER: Set[str] = DIRECTORY_DOMAINS.union({
     "bseindia.com","nseindia.com","gem.gov.in","gov.in","nic.in"
 })
 
-FREE_MAIL: Set[str] = {
-    "gmail.com","yahoo.com","outlook.com","hotmail.com","rediffmail.com","live.com","icloud.com",
-    "aol.com","proton.me","protonmail.com","yandex.com","zoho.com","gmx.com"
-}
-
 # Broadened candidate paths for generic sites, while keeping the industrial-friendly ones
 CANDIDATE_PATHS = [
     "/","/contact","/contact-us","/about","/about-us","/team","/people","/reach-us",
     "/contactus","/contacts","/company","/aboutus","/who-we-are","/impressum"
 ]
 
-EMAIL_RE = re.compile(r"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}")
-PHONE_RE = re.compile(r"(?:\+?\d{1,3}[-\s]?)?\d[\d\-\s]{8,}\d")  # keep broad; normalize later if needed
-TITLE_SPLIT_RE = re.compile(r"[-|–|:|•|,]")
+try:
+    import re2 as _page_re  # linear-time DFA engine (google-re2), optional
+except ImportError:
+    _page_re = re
+
+# Page-body scanners run over every fetched page; compiled with RE2 when
+# available to get linear-time matching on large HTML. Bytes patterns: pages
+# stay undecoded and only matched substrings (and the title) become str.
+EMAIL_RE = _page_re.compile(rb"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}")
+PHONE_RE = _page_re.compile(rb"(?:\+?\d{1,3}[-\s]?)?\d[\d\-\s]{8,}\d")  # keep broad; normalize later if needed
+LINKEDIN_RE = _page_re.compile(rb"https?://(?:in\.)?linkedin\.com/(company|in)/[A-Za-z0-9\-_/%]+", re.I)
+TITLE_TAG_RE = re.compile(rb"<title[^>]*>(.*?)</title>", re.I|re.S)
 
 TITLE_BLACKLIST = {
     "home","jobs","account suspended","login","sign in","register","instagram","trader","catalog","marketplace"
@@ -108,31 +132,37 @@ PATH_BLACKLIST_SUBSTR = ("/login","/signin","/register","/account","/careers","/
 # Industrial-biased keywords retained, but optional depending on STRICT_MODE
 MUST_HAVE_KEYWORDS = ("manufactur","forg","machin","cnc","hydraul","gear","flange","crankshaft","valve","pump","auto component")
 
+# Compiled alternations scan the text once at C speed instead of one
+# Python-level `in`/re.search pass per keyword.
+MUST_HAVE_RE = re.compile("|".join(re.escape(k) for k in MUST_HAVE_KEYWORDS))
+COMPANY_TYPE_RE = re.compile("|".join(re.escape(k) for k in TARGET_COMPANY_TYPES), re.I)
+_COMPANY_TYPE_CANON = {k.lower(): k for k in TARGET_COMPANY_TYPES}
+
 # ---------------------------- Utils ----------------------------
 def iso_now() -> str:
     return datetime.now(timezone.utc).astimezone().isoformat()
 
 def safe_mkdir(p: str): os.makedirs(p, exist_ok=True)
 
-def domain_of(url: str) -> Optional[str]:
-    try:
-        host = urllib.parse.urlparse(url).netloc.lower()
-        return host[4:] if host.startswith("www.") else host
-    except: return None
+def _host_tail_in(h: str, tails: Set[str]) -> bool:
+    # Probe each dot-delimited tail of the host (a.b.c -> a.b.c, b.c, c):
+    # O(labels) set hits instead of an endswith scan per blocklist entry,
+    # and it can no longer match mid-label (e.g. notindiamart.com).
+    parts = h.split(".")
+    return any(".".join(parts[i:]) in tails for i in range(len(parts)))
 
-def is_valid_url(u: str) -> bool:
-    try:
-        p = urllib.parse.urlparse(u)
-        return p.scheme in ("http","https") and "." in (p.netloc or "")
-    except: return False
+def is_blocked_host(h: Optional[str]) -> bool:
+    return bool(h) and _host_tail_in(h.lower(), SERP_NEVER)
 
+@lru_cache(maxsize=4096)
 def is_dir_domain(host: Optional[str]) -> bool:
     if not host: return False
     h = host.lower()
-    if any(h.endswith(d) for d in DIRECTORY_DOMAINS): return True
+    if _host_tail_in(h, DIRECTORY_DOMAINS): return True
     if h.endswith((".gov.in",".nic.in",".ac.in",".edu",".edu.in")): return True
     return False
 
+@lru_cache(maxsize=4096)
 def normalize_phone(raw: str) -> Optional[str]:
     if not raw: return None
     digits = re.sub(r"\D","", raw)
@@ -141,29 +171,6 @@ def normalize_phone(raw: str) -> Optional[str]:
         digits = digits[-15:]
     return digits if 10 <= len(digits) <= 15 else None
 
-def is_valid_email(e: str) -> bool:
-    if not e: return False
-    m = re.match(r"^[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}$", e.strip())
-    return bool(m)
-
-def rank_email(email: str, site_dom: Optional[str]) -> int:
-    if not is_valid_email(email): return 0
-    dom = email.split("@")[-1].lower()
-    if site_dom and dom == site_dom: return 3
-    if dom in FREE_MAIL: return 1
-    return 2
-
-def fuzzy_sim(a: str, b: str) -> float:
-    a = " ".join(sorted(a.lower().split()))
-    b = " ".join(sorted(b.lower().split()))
-    return SequenceMatcher(None, a, b).ratio()
-
-def title_head(s: str) -> str:
-    if not s: return ""
-    t = TITLE_SPLIT_RE.split(s)[0].strip()
-    t = re.sub(r"\b(Indiamart|IndiaMART|Justdial|TradeIndia)\b.*$", "", t, flags=re.I).strip()
-    return t
-
 def best_company_from_url_or_title(url: str, title: str) -> Optional[str]:
     t = title_head(title)
     if 2 <= len(t) <= 120: return t
@@ -173,9 +180,8 @@ def best_company_from_url_or_title(url: str, title: str) -> Optional[str]:
 
 def match_company_type(text: str) -> Optional[str]:
     if not text: return None
-    for kw in TARGET_COMPANY_TYPES:
-        if re.search(re.escape(kw), text, re.I): return kw
-    return None
+    m = COMPANY_TYPE_RE.search(text)
+    return _COMPANY_TYPE_CANON[m.group(0).lower()] if m else None
 
 def industry_for_kw(kw: str) -> str:
     for i in TARGET_INDUSTRIES:
@@ -204,7 +210,7 @@ def looks_like_company_site(url: str, title: str, page_snippet: str) -> bool:
     # If STRICT_MODE, require industrial-ish hints; otherwise allow any decent-looking company page
     if STRICT_MODE:
         body = (page_snippet or "").lower()
-        hit = any(k in t for k in MUST_HAVE_KEYWORDS) or any(k in body for k in MUST_HAVE_KEYWORDS)
+        hit = MUST_HAVE_RE.search(t) or MUST_HAVE_RE.search(body)
         return bool(hit)
     else:
         return True
@@ -227,11 +233,30 @@ class LeadsDB:
     def __init__(self, path: str, logger: logging.Logger):
         self.path = path; self.logger = logger
         safe_mkdir(os.path.dirname(path))
-        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
-        self.conn.execute("PRAGMA journal_mode=WAL;")
-        self.conn.execute("PRAGMA synchronous=NORMAL;")
+        # The run works against an in-memory copy (hydrated from the existing
+        # file, if any) so inserts never wait on the disk WAL; flush_to_disk()
+        # persists everything in one backup at the end of the run.
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        if os.path.isfile(path):
+            disk = sqlite3.connect(path, timeout=30)
+            try: disk.backup(self.conn)
+            finally: disk.close()
+        self.conn.execute("PRAGMA temp_store=MEMORY;")
+        self.conn.execute("PRAGMA cache_size=-65536;")
         self._schema()
 
+    def flush_to_disk(self):
+        disk = sqlite3.connect(self.path, timeout=30)
+        try:
+            disk.execute("PRAGMA journal_mode=WAL;")
+            disk.execute("PRAGMA synchronous=NORMAL;")
+            disk.execute("PRAGMA temp_store=MEMORY;")
+            disk.execute("PRAGMA mmap_size=268435456;")
+            disk.execute("PRAGMA cache_size=-65536;")
+            self.conn.backup(disk)
+        finally:
+            disk.close()
+
     def _schema(self):
         c = self.conn.cursor()
         c.execute("""
@@ -261,21 +286,24 @@ class LeadsDB:
         except Exception:
             pass
 
-    def upsert(self, row: Dict[str, Any], batch_id: str) -> Optional[int]:
+    def upsert_batch(self, rows: List[Dict[str, Any]], batch_id: str) -> int:
+        """One executemany + commit for a whole combo instead of a
+        transaction (and its WAL fsync) per row."""
+        if not rows: return 0
         cols = ["company_name","contact_person","email","phone","website","industry","location",
                 "company_type","source","scraped_date","linkedin_url","enriched_emails","batch_id"]
-        vals = [row.get(k,"") for k in cols[:-1]] + [batch_id]
+        vals = [[r.get(k,"") for k in cols[:-1]] + [batch_id] for r in rows]
         try:
             cur = self.conn.cursor()
-            cur.execute(f"""
+            cur.executemany(f"""
                 INSERT INTO leads ({",".join(cols)})
                 VALUES ({",".join(["?"]*len(cols))});
             """, vals)
             self.conn.commit()
-            return cur.lastrowid
+            return cur.rowcount
         except Exception as e:
-            self.logger.info(f"DB insert skipped/failed: {e}")
-            return None
+            self.logger.info(f"DB batch insert skipped/failed: {e}")
+            return 0
 
     def fetch_batch(self, batch_id: str) -> List[Tuple]:
         cur = self.conn.cursor()
@@ -284,6 +312,30 @@ class LeadsDB:
                        FROM leads WHERE batch_id = ?""", (batch_id,))
         return cur.fetchall()
 
+def _open_xlsx_sink(xlsx_path: str):
+    """Streaming XLSX row sink as an (append, close) pair.
+
+    Prefers xlsxwriter constant_memory, which flushes each row to disk and
+    holds O(1) state; falls back to openpyxl write-only. Returns None when
+    neither writer is installed (export then skips the XLSX)."""
+    try:
+        import xlsxwriter
+        wb = xlsxwriter.Workbook(xlsx_path, {"constant_memory": True, "strings_to_urls": False})
+        ws = wb.add_worksheet("Leads")
+        row = [0]
+        def append(vals):
+            ws.write_row(row[0], 0, vals); row[0] += 1
+        return append, wb.close
+    except ImportError:
+        pass
+    try:
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Leads")
+        return ws.append, (lambda: wb.save(xlsx_path))
+    except Exception:
+        return None
+
 def export_csv_xlsx(rows: List[Tuple], out_dir: str) -> Tuple[str,str]:
     safe_mkdir(out_dir)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -291,24 +343,25 @@ def export_csv_xlsx(rows: List[Tuple], out_dir: str) -> Tuple[str,str]:
     xlsx_path = os.path.join(out_dir, f"b2b_leads_{ts}.xlsx")
     headers = ["ID","Company Name","Contact Person","Email","Phone","Website","Industry",
                "Location","Company Type","Source","Date","LinkedIn URL","Enriched Emails"]
+    # one pass over `rows` feeds both writers; the XLSX sink streams rows
+    # instead of building an in-memory workbook
+    sink = _open_xlsx_sink(xlsx_path)
+    if sink: sink[0](headers)
     with open(csv_path,"w",newline="",encoding="utf-8") as f:
         w = csv.writer(f); w.writerow(headers)
         n=0
         for r in rows:
             (cid,cname,cp,em,ph,web,ind,loc,ctype,src,dt,li,ee) = r
-            w.writerow([cid, cname or "", cp or "", em or "", ph or "", web or "", ind or "", loc or "",
-                        ctype or "", src or "", dt or "", li or "", ee or ""])
+            out = [cid, cname or "", cp or "", em or "", ph or "", web or "", ind or "", loc or "",
+                   ctype or "", src or "", dt or "", li or "", ee or ""]
+            w.writerow(out)
+            if sink: sink[0](out)
             n+=1
             if n>=CSV_MAX_ROWS: break
-    try:
-        from openpyxl import Workbook
-        wb=Workbook(); ws=wb.active; ws.title="Leads"
-        ws.append(headers)
-        with open(csv_path,"r",encoding="utf-8") as f:
-            next(f)
-            for row in csv.reader(f): ws.append(row)
-        wb.save(xlsx_path)
-    except Exception:
+    if sink:
+        try: sink[1]()
+        except Exception: xlsx_path=""
+    else:
         xlsx_path=""
     return csv_path, xlsx_path
 
@@ -318,34 +371,74 @@ class Http:
         self.logger=logger
         self.timeout=timeout
         self._session: Optional[aiohttp.ClientSession] = None
-        self._host_last: Dict[str, float] = {}
+        self.parse_pool: Optional[ProcessPoolExecutor] = None
+        # host -> [Semaphore(K), next-allowed monotonic timestamp]
+        self._buckets: Dict[str, list] = {}
+        # Session-wide cap across all combos; past ~500 in-flight requests
+        # aiohttp starts failing with connector/DNS errors.
+        self._sem = asyncio.Semaphore(MAX_WORKERS)
     async def __aenter__(self):
+        # Page parsing is CPU work; a worker pool keeps it off the event loop
+        # (SCRAPER_PARSE_PROCS=0 disables the pool and parses inline).
+        procs = int(os.environ.get("SCRAPER_PARSE_PROCS", str(os.cpu_count() or 2)))
+        self.parse_pool = ProcessPoolExecutor(max_workers=procs) if procs > 0 else None
+        try:
+            from aiohttp.resolver import AsyncResolver  # needs aiodns
+            resolver = AsyncResolver()
+        except Exception:
+            resolver = None
+        # Keep-alive + pooled connector: re-hitting the same company/directory
+        # domains reuses TCP+TLS sessions and cached DNS instead of a fresh
+        # handshake per request (the old Connection: close defeated both).
+        connector = aiohttp.TCPConnector(
+            limit=MAX_WORKERS, limit_per_host=8, ttl_dns_cache=300,
+            keepalive_timeout=30, enable_cleanup_closed=True, resolver=resolver)
         self._session = aiohttp.ClientSession(
+            connector=connector,
             timeout=aiohttp.ClientTimeout(total=self.timeout),
-            headers={"User-Agent": UA, "Accept-Language": ALANG, "Connection":"close"}
+            headers={"User-Agent": UA, "Accept-Language": ALANG}
         )
         return self
     async def __aexit__(self, *exc):
         if self._session: await self._session.close()
+        if self.parse_pool: self.parse_pool.shutdown(cancel_futures=True)
+    PER_HOST_CONCURRENCY = 4
+
     async def _pace(self, host: str):
-        last = self._host_last.get(host, 0.0)
-        wait = max(0.0, MIN_REQUEST_INTERVAL - (time.time()-last))
-        if wait>0: await asyncio.sleep(wait)
-        self._host_last[host] = time.time()
+        # Token-bucket per host: up to K waiters pace concurrently while
+        # request starts stay MIN_REQUEST_INTERVAL apart on the monotonic
+        # clock. The old shared-sleep version woke a burst of coroutines
+        # strictly serially, paying O(N*interval) wall time.
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = [asyncio.Semaphore(self.PER_HOST_CONCURRENCY), 0.0]
+        async with bucket[0]:
+            now = time.monotonic()
+            slot = max(now, bucket[1] + MIN_REQUEST_INTERVAL)
+            bucket[1] = slot
+            if slot > now:
+                await asyncio.sleep(slot - now)
     async def get(self, url: str, headers: Optional[Dict[str,str]]=None, retries: int=3) -> Optional[bytes]:
         if not self._session: raise RuntimeError("session not started")
         host = urllib.parse.urlparse(url).netloc.lower()
         for attempt in range(1, retries+1):
             try:
                 await self._pace(host)
-                async with self._session.get(url, headers=headers) as resp:
-                    if resp.status in (429, 500, 502, 503, 504) and attempt<retries:
-                        await asyncio.sleep(1.5*attempt + random.uniform(0,1)); continue
-                    if resp.status>=400:
-                        if resp.status not in (403,404):
-                            self.logger.warning(f"HTTP {resp.status} {url}")
-                        return None
-                    return await resp.read()
+                async with self._sem:
+                    async with self._session.get(url, headers=headers) as resp:
+                        if resp.status in (429, 500, 502, 503, 504) and attempt<retries:
+                            await asyncio.sleep(1.5*attempt + random.uniform(0,1)); continue
+                        if resp.status>=400:
+                            if resp.status not in (403,404):
+                                self.logger.warning(f"HTTP {resp.status} {url}")
+                            return None
+                        # Skip PDFs/media without downloading them, and cap how
+                        # much of huge pages we pull; the scanners only look at
+                        # html/text/json anyway.
+                        ctype = resp.headers.get("Content-Type", "")
+                        if ctype and not any(t in ctype for t in ("html","text","json")):
+                            return None
+                        return await resp.content.read(MAX_FETCH_BYTES)
             except Exception as e:
                 if attempt<retries:
                     await asyncio.sleep(1.0 + random.uniform(0,1)); continue
@@ -357,14 +450,15 @@ class Http:
         for attempt in range(1, retries+1):
             try:
                 await self._pace(host)
-                async with self._session.post(url, json=payload, headers=headers) as resp:
-                    if resp.status in (429, 500, 502, 503, 504) and attempt<retries:
-                        await asyncio.sleep(1.5*attempt + random.uniform(0,1)); continue
-                    if resp.status>=400:
-                        if resp.status not in (403,404):
-                            self.logger.warning(f"HTTP {resp.status} {url}")
-                        return None
-                    return await resp.read()
+                async with self._sem:
+                    async with self._session.post(url, json=payload, headers=headers) as resp:
+                        if resp.status in (429, 500, 502, 503, 504) and attempt<retries:
+                            await asyncio.sleep(1.5*attempt + random.uniform(0,1)); continue
+                        if resp.status>=400:
+                            if resp.status not in (403,404):
+                                self.logger.warning(f"HTTP {resp.status} {url}")
+                            return None
+                        return await resp.read()
             except Exception as e:
                 if attempt<retries:
                     await asyncio.sleep(1.0 + random.uniform(0,1)); continue
@@ -384,16 +478,16 @@ class SerpAPI:
         data = await http.get(url, headers={"Accept":"application/json"})
         if not data: return []
         try:
-            js = json.loads(data.decode("utf-8","ignore"))
+            js = _loads_bytes(data)
             out=[]
             for it in js.get("organic_results",[]) or []:
                 link = it.get("link")
                 if link and is_valid_url(link):
                     h = domain_of(link) or ""
-                    if any(h.endswith(b) for b in SERP_NEVER): continue
+                    if is_blocked_host(h): continue
                     out.append(link)
             return out
-        except: return []
+        except ValueError: return []  # orjson/json decode error
 
 class Serper:
     @staticmethod
@@ -406,16 +500,16 @@ class Serper:
         })
         if not data: return []
         try:
-            js = json.loads(data.decode("utf-8","ignore"))
+            js = _loads_bytes(data)
             out=[]
             for it in js.get("organic",[]) or []:
                 link = it.get("link")
                 if link and is_valid_url(link):
                     h = domain_of(link) or ""
-                    if any(h.endswith(b) for b in SERP_NEVER): continue
+                    if is_blocked_host(h): continue
                     out.append(link)
             return out
-        except: return []
+        except ValueError: return []  # orjson/json decode error
 
 QUERY_TEMPLATES = [
     '{kw} manufacturers in {city} India -indiamart -tradeindia -justdial -yellowpages -exportersindia',
@@ -431,33 +525,61 @@ def build_queries(kw: str, city: str) -> List[str]:
     return [t.format(kw=kw, city=city) for t in QUERY_TEMPLATES]
 
 # ---------------------------- Site crawl & parse ----------------------------
-def extract_emails(text: str) -> List[str]:
-    return list(dict.fromkeys(m.group(0).strip() for m in EMAIL_RE.finditer(text or "")))
+def extract_emails(data: bytes) -> List[str]:
+    return list(dict.fromkeys(
+        m.group(0).decode("utf-8","ignore").strip() for m in EMAIL_RE.finditer(data or b"")))
 
-def extract_phones(text: str) -> List[str]:
+def extract_phones(data: bytes) -> List[str]:
     out=[]
-    for m in PHONE_RE.findall(text or ""):
-        p = normalize_phone(m)
+    for m in PHONE_RE.findall(data or b""):
+        p = normalize_phone(m.decode("utf-8","ignore"))
         if p: out.append(p)
     return list(dict.fromkeys(out))
 
-def extract_linkedin(text: str) -> Optional[str]:
-    m = re.search(r"https?://(?:in\.)?linkedin\.com/(company|in)/[A-Za-z0-9\-_/%]+", text or "", re.I)
-    return m.group(0) if m else None
+def extract_linkedin(data: bytes) -> Optional[str]:
+    m = LINKEDIN_RE.search(data or b"")
+    return m.group(0).decode("utf-8","ignore") if m else None
+
+# offloading tiny pages to another process costs more in pickling than the
+# parse saves; only bodies at least this big leave the event loop
+PARSE_OFFLOAD_MIN = 32 * 1024
+
+def parse_page(data: bytes, url: str) -> Tuple[List[str], List[str], Optional[str], str, str]:
+    """Pure per-page extraction (no I/O, picklable args) so it can run in a
+    ProcessPoolExecutor without blocking the event loop."""
+    snippet = data[:2000].decode("utf-8","ignore")
+    title, li_url = "", None
+    if _HTMLParser is not None:
+        tree = _HTMLParser(data)
+        node = tree.css_first("title")
+        if node:
+            title = re.sub(r"\s+"," ", node.text()).strip()[:180]
+        for a in tree.css('a[href*="linkedin"]'):
+            m = LINKEDIN_RE.search((a.attributes.get("href") or "").encode("utf-8","ignore"))
+            if m: li_url = m.group(0).decode("utf-8","ignore"); break
+    else:
+        m = TITLE_TAG_RE.search(data)
+        if m:
+            raw = re.sub(r"\s+"," ", m.group(1).decode("utf-8","ignore")).strip()
+            title = unescape(raw[:180])
+    emails = [e for e in extract_emails(data)
+              if is_valid_email(e) and not any(e.lower().endswith("@"+d) for d in DIRECTORY_DOMAINS)]
+    phones = extract_phones(data)
+    if not li_url:
+        li_url = extract_linkedin(data)
+    return (emails, phones, li_url, title, snippet)
 
 class SiteScanner:
     def __init__(self, http: Http, logger: logging.Logger):
         self.http=http; self.logger=logger
         self.page_cache: Dict[str, bytes] = {}
-    async def fetch(self, url: str) -> Optional[str]:
+    async def fetch(self, url: str) -> Optional[bytes]:
         if url in self.page_cache:
-            try: return self.page_cache[url].decode("utf-8","ignore")
-            except: return None
+            return self.page_cache[url]
         data = await self.http.get(url)
         if not data: return None
         self.page_cache[url] = data
-        try: return data.decode("utf-8","ignore")
-        except: return None
+        return data
     async def crawl(self, site_url: str) -> Tuple[List[str], List[str], Optional[str], str, str]:
         if not is_valid_url(site_url): return ([],[],None,"","")
         base = urllib.parse.urljoin(site_url, "/")
@@ -465,23 +587,25 @@ class SiteScanner:
         if is_dir_domain(dom): return ([],[],None,"","")
         found_e, found_p = set(), set()
         li_url, title, last_text = None, "", ""
-        for p in CANDIDATE_PATHS:
-            url = urllib.parse.urljoin(base, p)
-            text = await self.fetch(url)
-            if not text: continue
-            last_text = text[:2000]
-            if not title:
-                m = re.search(r"<title[^>]*>(.*?)</title>", text, re.I|re.S)
-                if m:
-                    raw = re.sub(r"\s+"," ", m.group(1)).strip()
-                    title = unescape(raw[:180])
-            for e in extract_emails(text):
-                if is_valid_email(e) and not any(e.lower().endswith("@"+d) for d in DIRECTORY_DOMAINS):
-                    found_e.add(e)
-            for ph in extract_phones(text): found_p.add(ph)
-            if not li_url:
-                li = extract_linkedin(text)
-                if li: li_url = li
+        pool = self.http.parse_pool
+        # Fetch all candidate paths at once (the per-host token bucket still
+        # paces the requests) instead of paying a full RTT per path; results
+        # are folded in path order so early-stop semantics stay the same.
+        urls = [urllib.parse.urljoin(base, p) for p in CANDIDATE_PATHS]
+        pages = await asyncio.gather(*(self.fetch(u) for u in urls), return_exceptions=True)
+        for url, data in zip(urls, pages):
+            if not data or isinstance(data, BaseException): continue
+            if pool is not None and len(data) >= PARSE_OFFLOAD_MIN:
+                loop = asyncio.get_running_loop()
+                emails, phones, li, ptitle, snippet = await loop.run_in_executor(
+                    pool, parse_page, data, url)
+            else:
+                emails, phones, li, ptitle, snippet = parse_page(data, url)
+            last_text = snippet
+            if not title and ptitle: title = ptitle
+            found_e.update(emails)
+            found_p.update(phones)
+            if not li_url and li: li_url = li
             # early stop if we already have good signals
             if any(rank_email(e, dom)==3 for e in found_e) and found_p and li_url:
                 break
@@ -490,14 +614,78 @@ class SiteScanner:
         return (emails, phones, li_url, title, last_text)
 
 # ---------------------------- Dedupe Index ----------------------------
+_MERSENNE61 = (1 << 61) - 1
+
+class MinHashLSH:
+    """Banded MinHash index over character 4-grams.
+
+    query() returns only the stored strings that share a signature band with
+    the probe, so a membership check is a handful of dict probes plus a
+    fuzzy_sim verify of those few candidates — instead of a SequenceMatcher
+    pass over every stored string."""
+    NUM_PERM = 64
+
+    def __init__(self, threshold: float):
+        # fewer, wider bands -> stricter candidate recall (higher threshold)
+        self.bands = 4 if threshold >= 0.90 else 8
+        self.rows = self.NUM_PERM // self.bands
+        rnd = random.Random(0x5EED)
+        self._perms = [(rnd.randrange(1, _MERSENNE61), rnd.randrange(_MERSENNE61))
+                       for _ in range(self.NUM_PERM)]
+        self._tables: List[Dict[Tuple[int, ...], List[str]]] = [{} for _ in range(self.bands)]
+
+    def _signature(self, s: str) -> List[int]:
+        s = s.lower()
+        grams = {s[i:i+4] for i in range(max(1, len(s) - 3))}
+        hs = [hash(g) & 0xFFFFFFFFFFFFFFFF for g in grams]
+        return [min((a * h + b) % _MERSENNE61 for h in hs) for a, b in self._perms]
+
+    def add(self, s: str):
+        sig = self._signature(s)
+        for i, table in enumerate(self._tables):
+            table.setdefault(tuple(sig[i*self.rows:(i+1)*self.rows]), []).append(s)
+
+    def query(self, s: str) -> List[str]:
+        sig = self._signature(s)
+        out: List[str] = []
+        for i, table in enumerate(self._tables):
+            out.extend(table.get(tuple(sig[i*self.rows:(i+1)*self.rows]), ()))
+        return out
+
+class BloomFilter:
+    """Plain-bytearray Bloom filter fronting the exact dedupe sets: the common
+    "definitely not seen" lookup touches k bits instead of hashing a long key
+    into a big set. Sized for ~1e6 entries at ~1e-4 false positives (~2.3MB);
+    a false positive just falls through to the exact set, so answers never
+    change. Inline rather than pybloom_live to stay dependency-light."""
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-4):
+        nbits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self._nbits = nbits
+        self._k = max(1, round(nbits / capacity * math.log(2)))
+        self._bits = bytearray((nbits + 7) // 8)
+    def _indexes(self, s: str):
+        # double hashing: k indexes from two hashes of the key
+        h1 = hash(s) & 0xFFFFFFFFFFFFFFFF
+        h2 = hash("\x00" + s) | 1
+        for i in range(self._k):
+            yield ((h1 + i * h2) & 0xFFFFFFFFFFFFFFFF) % self._nbits
+    def add(self, s: str):
+        for ix in self._indexes(s):
+            self._bits[ix >> 3] |= 1 << (ix & 7)
+    def __contains__(self, s: str) -> bool:
+        return all(self._bits[ix >> 3] & (1 << (ix & 7)) for ix in self._indexes(s))
+
 class DedupeIndex:
     def __init__(self):
         self.by_domain: Set[str] = set()
+        self.by_etld1: Set[str] = set()
         self.by_phone: Set[str] = set()
         self.by_email: Set[str] = set()
         self.by_li_slug: Set[str] = set()
-        self.names: List[str] = []
-        self.titles: List[str] = []
+        # one shared bloom, keys prefixed per kind so types can't collide
+        self.bloom = BloomFilter()
+        self.names = MinHashLSH(threshold=0.85)
+        self.titles = MinHashLSH(threshold=0.90)
     @staticmethod
     def _li_slug(url: Optional[str]) -> Optional[str]:
         if not url: return None
@@ -507,28 +695,33 @@ class DedupeIndex:
         except: return None
     def seen_domain(self, url: str) -> bool:
         d = domain_of(url) or ""
-        return d in self.by_domain
+        return bool(d) and "d:"+d in self.bloom and d in self.by_domain
     def add(self, company: str, website: str, phone: Optional[str], email: Optional[str], li: Optional[str], title: Optional[str]):
         d = domain_of(website) or ""
-        if d: self.by_domain.add(d)
-        if phone: self.by_phone.add(phone)
-        if email: self.by_email.add(email.lower())
+        if d: self.by_domain.add(d); self.bloom.add("d:"+d)
+        e1 = etld1(website)
+        if e1: self.by_etld1.add(e1)
+        if phone: self.by_phone.add(phone); self.bloom.add("p:"+phone)
+        if email: self.by_email.add(email.lower()); self.bloom.add("e:"+email.lower())
         slug = self._li_slug(li)
-        if slug: self.by_li_slug.add(slug)
-        if company: self.names.append(company)
-        if title: self.titles.append(title_head(title))
+        if slug: self.by_li_slug.add(slug); self.bloom.add("l:"+slug)
+        # store the normalized form so each lookup normalizes only its query
+        if company: self.names.add(norm_text(company))
+        if title: self.titles.add(norm_text(title_head(title)))
     def is_duplicate(self, company: str, website: str, phone: Optional[str], email: Optional[str], li: Optional[str], title: Optional[str]) -> bool:
         d = domain_of(website) or ""
-        if d and d in self.by_domain: return True
-        if phone and phone in self.by_phone: return True
-        if email and email.lower() in self.by_email: return True
+        if d and "d:"+d in self.bloom and d in self.by_domain: return True
+        if phone and "p:"+phone in self.bloom and phone in self.by_phone: return True
+        em = (email or "").lower()
+        if em and "e:"+em in self.bloom and em in self.by_email: return True
         slug = self._li_slug(li)
-        if slug and slug in self.by_li_slug: return True
-        th = title_head(title or "")
-        for n in self.names:
-            if fuzzy_sim(n, company) >= 0.85: return True
-        for t in self.titles:
-            if fuzzy_sim(t, th) >= 0.90: return True
+        if slug and "l:"+slug in self.bloom and slug in self.by_li_slug: return True
+        cn = norm_text(company)
+        th = norm_text(title_head(title or ""))
+        for n in self.names.query(cn):
+            if fuzzy_sim_norm(n, cn) >= 0.85: return True
+        for t in self.titles.query(th):
+            if fuzzy_sim_norm(t, th) >= 0.90: return True
         return False
 
 # ---------------------------- Orchestrator ----------------------------
@@ -563,14 +756,16 @@ class Scraper:
                 batch.extend(await SerpAPI.search(http, q, city, num=self.limit_per_combo*2))
             if "serper" in self.sources:
                 batch.extend(await Serper.search(http, q, city, num=self.limit_per_combo*2))
+            # key by registrable domain so www./sub-host variants collapse to
+            # one crawl seed, and enqueue only etld1s not already inserted
             uniq: Dict[str,str] = {}
             for u in batch:
                 if not is_valid_url(u): continue
                 h = domain_of(u) or ""
-                if any(h.endswith(b) for b in SERP_NEVER): continue
-                uniq.setdefault(h, u)
-            new_domains = [h for h in uniq.keys() if not self.dedupe.seen_domain(uniq[h])]
-            urls.extend(list(uniq.values()))
+                if is_blocked_host(h): continue
+                uniq.setdefault(etld1(u) or h, u)
+            new_domains = [k for k in uniq if k not in self.dedupe.by_etld1]
+            urls.extend(uniq[k] for k in new_domains)
             if len(new_domains) <= max(2, math.ceil(0.3*len(uniq))): break
             if len(urls) >= self.limit_per_combo*3 or self.time_up(): break
         outs=[]
@@ -619,44 +814,69 @@ class Scraper:
         if row["email"] and any(row["email"].lower().endswith("@"+d) for d in DIRECTORY_DOMAINS): return None
         return row
 
-    async def run_combo(self, http: Http, kw: str, city: str, scanner: SiteScanner):
+    async def run_combo(self, http: Http, kw: str, city: str, scanner: SiteScanner) -> List[Dict[str, Any]]:
         seeds = await self.serp_seed(http, kw, city)
-        if not seeds: return
-        sem = asyncio.Semaphore(self.max_workers)
+        if not seeds: return []
+        # concurrency is capped globally inside Http; no per-combo semaphore
         async def task(site):
-            async with sem:
-                try:
-                    return await self.process_site(scanner, site, kw, city)
-                except Exception as e:
-                    self.logger.info(f"process_site error {site}: {e}")
-                    return None
+            try:
+                return await self.process_site(scanner, site, kw, city)
+            except Exception as e:
+                self.logger.info(f"process_site error {site}: {e}")
+                return None
         tasks = [asyncio.create_task(task(s)) for s in seeds]
+        accepted: List[Dict[str, Any]] = []
         for coro in asyncio.as_completed(tasks):
             if self.time_up(): break
             row = await coro
             if not row: continue
             if self.dedupe.is_duplicate(row["company_name"], row["website"], row["phone"] or None, row["email"] or None, row["linkedin_url"] or None, ""):
                 continue
-            rid = self.db.upsert(row, self.batch_id)
-            if rid:
-                self.dedupe.add(row["company_name"], row["website"], row["phone"], row["email"], row["linkedin_url"], "")
-                self.logger.info(f"Inserted: {row['company_name']} ({rid})")
-            else:
-                self.logger.info(f"Skipped (duplicate/failed): {row['company_name']}")
-
-    async def run(self, locations: List[str], keywords: List[str]):
+            self.dedupe.add(row["company_name"], row["website"], row["phone"], row["email"], row["linkedin_url"], "")
+            accepted.append(row)
+            self.logger.info(f"Accepted: {row['company_name']}")
+        n = self.db.upsert_batch(accepted, self.batch_id)
+        if accepted:
+            self.logger.info(f"Inserted {n}/{len(accepted)} rows for '{kw}' @ {city}")
+        return accepted
+
+    def _export_shard(self, rows: List[Dict[str, Any]]) -> str:
+        """Write one combo's accepted rows to Exports/shards/<batch>/ so a
+        caller can start enriching them while later combos still scrape."""
+        out_dir = os.path.join(self.base_dir, "Exports", "shards", self.batch_id)
+        safe_mkdir(out_dir)
+        self._shard_seq = getattr(self, "_shard_seq", 0) + 1
+        path = os.path.join(out_dir, f"combo_{self._shard_seq:03d}.csv")
+        headers = ["ID","Company Name","Contact Person","Email","Phone","Website","Industry",
+                   "Location","Company Type","Source","Date","LinkedIn URL","Enriched Emails"]
+        with open(path,"w",newline="",encoding="utf-8") as f:
+            w = csv.writer(f); w.writerow(headers)
+            for i, r in enumerate(rows, 1):
+                w.writerow([str(i), r.get("company_name",""), r.get("contact_person",""), r.get("email",""),
+                            r.get("phone",""), r.get("website",""), r.get("industry",""), r.get("location",""),
+                            r.get("company_type",""), r.get("source",""), r.get("scraped_date",""),
+                            r.get("linkedin_url",""), r.get("enriched_emails","")])
+        return path
+
+    async def run(self, locations: List[str], keywords: List[str], on_combo=None):
         combos = [(kw, loc) for loc in locations for kw in keywords]
         self.logger.info(f"Starting (combos={len(combos)}, limit_per_combo={self.limit_per_combo}, sources={self.sources})")
         async with Http(self.logger, DEFAULT_TIMEOUT) as http:
             scanner = SiteScanner(http, self.logger)
             for (kw, city) in combos:
                 if self.time_up(): break
-                await self.run_combo(http, kw, city, scanner)
+                accepted = await self.run_combo(http, kw, city, scanner)
+                if on_combo and accepted:
+                    # hand the finished combo to the caller (e.g. pipelined
+                    # enrichment) without waiting for the remaining combos
+                    try: on_combo(self._export_shard(accepted))
+                    except Exception as e: self.logger.info(f"on_combo error: {e}")
 
         rows = self.db.fetch_batch(self.batch_id)     # only this run
         csv_path, xlsx_path = export_csv_xlsx(rows, os.path.join(self.base_dir, "Exports"))
         self.logger.info(f"Exported CSV: {csv_path}")
         self.logger.info(f"Exported Excel: {xlsx_path or '(skipped)'}")
+        self.db.flush_to_disk()  # one backup instead of per-combo WAL writes
 
 # ---------------------------- CLI ----------------------------
 def parse_cli():
@@ -685,6 +905,11 @@ def parse_cli():
     }
 
 def main():
+    try:
+        import uvloop  # libuv event loop; drop-in speedup for socket-heavy runs
+        uvloop.install()
+    except ImportError:
+        pass
     script_dir = os.path.dirname(os.path.abspath(__file__))
     base_dir = os.path.dirname(script_dir)
     safe_mkdir(os.path.join(base_dir, "Database"))
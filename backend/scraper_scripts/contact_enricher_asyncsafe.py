@@ -1,4 +1,4 @@
-﻿#!/usr/bin/env python3
+#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
 contact_enricher_asyncsafe.py
@@ -8,25 +8,165 @@ contact_enricher_asyncsafe.py
 - Keeps directory/domain/email safety
 - Outputs same 13 columns schema
 """
-import os, re, csv, glob, json, time, logging, urllib.parse, urllib.request
+import os, re, csv, glob, json, sys, time, logging, asyncio, sqlite3, urllib.parse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Optional, Dict, Any, List, Tuple, Set
 
+try:
+    import aiohttp
+except ImportError:
+    print("Please install aiohttp: pip install aiohttp", file=sys.stderr); sys.exit(1)
+
+# orjson parses the raw response bytes directly (no intermediate decode);
+# stdlib json is the drop-in fallback, same as in the scrapers
+try:
+    import orjson
+    def _loads_bytes(b: bytes): return orjson.loads(b)
+except ImportError:
+    def _loads_bytes(b: bytes): return json.loads(b.decode("utf-8","ignore"))
+
 APP="contact_enricher_asyncsafe"
 DIRECTORY_DOMAINS = {"indiamart.com","tradeindia.com","justdial.com","tiimg.com","lens.indiamart.com","3dcondl.com","exportersindia.com"}
 FREE_MAIL = {"gmail.com","yahoo.com","outlook.com","hotmail.com","rediffmail.com","live.com","icloud.com","aol.com","proton.me","protonmail.com","yandex.com","zoho.com","gmx.com"}
-EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}$")
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}")
+
+# Domains where Hunter/Clearbit results are meaningless: directories plus
+# free-mail providers. Checking this before any API call saves both the RTT
+# and the rate-limit quota. ENRICH_SKIP_REGEX adds an optional extra filter.
+SKIP_DOMAINS = frozenset(DIRECTORY_DOMAINS | FREE_MAIL)
+_SKIP_RE = re.compile(os.environ["ENRICH_SKIP_REGEX"]) if os.environ.get("ENRICH_SKIP_REGEX") else None
+
+# str.endswith takes a tuple and iterates it in C; precomputing these turns
+# the per-row/per-email any(...) generator scans into a single call.
+DOT_DIRECTORY = tuple("."+d for d in DIRECTORY_DOMAINS)
+AT_DIRECTORY = tuple("@"+d for d in DIRECTORY_DOMAINS)
+
+def _skip_api(dom: str)->bool:
+    if dom in SKIP_DOMAINS or dom.endswith(DOT_DIRECTORY): return True
+    return bool(_SKIP_RE and _SKIP_RE.search(dom))
+
+# Rows are enriched concurrently (Hunter + Clearbit are ~300ms RTTs each);
+# this caps how many are in flight at once.
+ENRICH_CONCURRENCY = int(os.environ.get("ENRICH_CONCURRENCY","16"))
+
+class TokenBucket:
+    """Paces calls to one API at `rps` requests/second. A server-mandated
+    pause (429 Retry-After, exhausted X-RateLimit-Remaining) penalizes the
+    bucket so every concurrent caller waits it out instead of retrying into
+    the same limit."""
+    def __init__(self, rps: float):
+        self.rps = max(rps, 0.1)
+        self.tokens = self.rps
+        self.last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rps, self.tokens + (now - self.last) * self.rps)
+            self.last = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rps)
+                self.last = time.monotonic()
+                self.tokens = 0.0
+            else:
+                self.tokens -= 1
+
+    def penalize(self, seconds: float):
+        # empty the bucket and push the refill clock into the future; the
+        # negative balance acquire() then sees covers the mandated pause
+        self.tokens = 0.0
+        self.last = time.monotonic() + seconds
+
+_HUNTER_BUCKET = TokenBucket(float(os.environ.get("HUNTER_RPS","5")))
+_CLEARBIT_BUCKET = TokenBucket(float(os.environ.get("CLEARBIT_RPS","5")))
+
+# Many rows share a Website domain, so each API is hit at most once per
+# domain: the cache holds Futures, and concurrent rows for the same domain
+# await the same in-flight request (single flight). Completed results
+# persist in Cache/enrichment.db for a week so repeat runs skip the network.
+_CACHE_TTL_SEC = 7*24*3600
+_HUNTER_CACHE: Dict[str, "asyncio.Future"] = {}
+_CLEARBIT_CACHE: Dict[str, "asyncio.Future"] = {}
+_HUNTER_TS: Dict[str, float] = {}
+_CLEARBIT_TS: Dict[str, float] = {}
+
+async def _cached(cache: Dict[str, "asyncio.Future"], key: str, fetch):
+    fut = cache.get(key)
+    if fut is not None:
+        return await fut
+    fut = cache[key] = asyncio.get_running_loop().create_future()
+    try:
+        res = await fetch()
+    except BaseException as e:
+        # the future must never stay pending: drop the entry so the next
+        # caller retries, and resolve it so current waiters unblock instead
+        # of hanging (reachable when a shard run is cancelled mid-fetch)
+        cache.pop(key, None)
+        if isinstance(e, asyncio.CancelledError):
+            fut.cancel()
+        else:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved; waiters still receive it
+        raise
+    fut.set_result(res)
+    return res
+
+def _open_cache_db(cache_dir: str)->sqlite3.Connection:
+    conn = sqlite3.connect(os.path.join(cache_dir, "enrichment.db"))
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("CREATE TABLE IF NOT EXISTS hunter (domain TEXT PRIMARY KEY, emails TEXT, fetched_at INT)")
+    conn.execute("CREATE TABLE IF NOT EXISTS clearbit (domain TEXT PRIMARY KEY, linkedin TEXT, fetched_at INT)")
+    return conn
 
-def is_valid_email(e:str)->bool: return bool(e and EMAIL_RE.match(e))
+def _load_cache_db(conn: sqlite3.Connection, table: str, col: str,
+                   cache: Dict[str, "asyncio.Future"], ts_map: Dict[str, float], decode):
+    loop = asyncio.get_running_loop(); now = time.time()
+    for dom, val, ts in conn.execute(f"SELECT domain, {col}, fetched_at FROM {table}"):
+        if now - (ts or 0) >= _CACHE_TTL_SEC: continue
+        fut = loop.create_future(); fut.set_result(decode(val))
+        cache[dom] = fut; ts_map[dom] = float(ts)
+
+def _save_cache_db(conn: sqlite3.Connection, table: str, col: str,
+                   cache: Dict[str, "asyncio.Future"], ts_map: Dict[str, float], encode):
+    now = time.time()
+    rows = []
+    for dom, fut in cache.items():
+        if not fut.done() or fut.cancelled() or fut.exception() is not None:
+            continue
+        val = fut.result()
+        if val is None:
+            # failed fetch (no key, outage): don't persist, retry next run
+            continue
+        rows.append((dom, encode(val), int(ts_map.get(dom, now))))
+    conn.executemany(f"INSERT OR REPLACE INTO {table} (domain, {col}, fetched_at) VALUES (?,?,?)", rows)
+    conn.commit()
+
+# The same candidate emails (pattern guesses, shared domains) repeat across
+# rows, so validation is memoized; fullmatch replaces the ^...$ anchors.
+@lru_cache(maxsize=8192)
+def is_valid_email(e:str)->bool:
+    # C-level guards reject most junk (no @, whitespace, non-ASCII) before
+    # the regex machinery ever spins up
+    if not e or "@" not in e or " " in e or not e.isascii(): return False
+    return bool(EMAIL_RE.fullmatch(e))
 
 def safe_mkdir(p:str): os.makedirs(p, exist_ok=True)
 
+# same single-pass parser as backend.utils.load_dotenv (this script must stay
+# importable standalone, so it cannot reach into the backend package)
+_DOTENV_RE = re.compile(rb"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(?:\"([^\"\n]*)\"|'([^'\n]*)'|([^\n#]*))", re.M)
+
 def load_env(path: str):
-    if not os.path.isfile(path): return
-    for line in open(path,"r",encoding="utf-8"):
-        s=line.strip()
-        if not s or s.startswith("#") or "=" not in s: continue
-        k,v=s.split("=",1); os.environ.setdefault(k.strip(), v.strip().strip('"').strip("'"))
+    try:
+        with open(path,"rb") as f: data=f.read()
+    except OSError: return
+    for m in _DOTENV_RE.finditer(data):
+        v=m.group(2) or m.group(3) or m.group(4) or b""
+        os.environ.setdefault(m.group(1).decode(), v.strip().decode())
 
 def domain_of(url: str)->Optional[str]:
     try:
@@ -35,129 +175,311 @@ def domain_of(url: str)->Optional[str]:
     except: return None
 
 def latest_csv(exports_dir: str)->Optional[str]:
-    files = sorted(glob.glob(os.path.join(exports_dir, "b2b_leads_*.csv")))
-    return files[-1] if files else None
+    # newest by mtime over the iglob generator; no full sorted list
+    files = glob.iglob(os.path.join(exports_dir, "b2b_leads_*.csv"))
+    return max(files, default=None, key=os.path.getmtime)
+
+HEADERS = ["ID","Company Name","Contact Person","Email","Phone","Website","Industry",
+           "Location","Company Type","Source","Date","LinkedIn URL","Enriched Emails"]
+
+# Rows are streamed through in batches of this size (read -> enrich
+# concurrently -> write) so memory stays O(batch) instead of holding the
+# input and output CSVs in full.
+_BATCH_ROWS = 64
+
+# ENRICH_INCREMENTAL=1 reuses rows from the previous enriched CSV (keyed by
+# Company Name + Website) so only leads that are new since the last run pay
+# the Hunter/Clearbit cost.
+ENRICH_INCREMENTAL = os.environ.get("ENRICH_INCREMENTAL","0") == "1"
 
-def read_rows(p:str)->List[Dict[str,str]]:
-    return list(csv.DictReader(open(p,"r",encoding="utf-8")))
+def _previous_enriched(exports_dir: str)->Dict[Tuple[str,str],Dict[str,str]]:
+    prev = max(glob.iglob(os.path.join(exports_dir,"b2b_leads_enriched_*.csv")),
+               default=None, key=os.path.getmtime)
+    if not prev: return {}
+    with open(prev,"r",encoding="utf-8") as f:
+        return {(r.get("Company Name",""), r.get("Website","")): r for r in csv.DictReader(f)}
 
-def write_rows(p:str, rows: List[Dict[str,str]]):
-    headers = ["ID","Company Name","Contact Person","Email","Phone","Website","Industry",
-               "Location","Company Type","Source","Date","LinkedIn URL","Enriched Emails"]
-    with open(p,"w",newline="",encoding="utf-8") as f:
-        w=csv.DictWriter(f, fieldnames=headers); w.writeheader()
-        for r in rows: w.writerow({h:r.get(h,"") for h in headers})
+# Transient failures worth a second attempt: rate limits and upstream 5xx.
+# Anything else >=400 is a real answer (bad key, unknown domain) and retrying
+# would just burn quota.
+_RETRY_STATUS = frozenset({429,500,502,503,504})
+_RETRY_TOTAL = 2
 
-def http_get(url: str, headers: Optional[Dict[str,str]]=None, timeout:int=12)->Optional[bytes]:
+def _retry_after(resp)->Optional[float]:
     try:
-        req = urllib.request.Request(url, headers=headers or {}, method="GET")
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            if resp.status>=400: return None
-            return resp.read()
-    except: return None
+        return float(resp.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+async def http_get(session: "aiohttp.ClientSession", url: str, headers: Optional[Dict[str,str]]=None,
+                   bucket: Optional[TokenBucket]=None)->Optional[bytes]:
+    # The shared TCPConnector already pools keep-alive connections (one TLS
+    # handshake per host, not per call); this adds retries with exponential
+    # backoff on transient statuses and connection errors.
+    for attempt in range(_RETRY_TOTAL+1):
+        if bucket:
+            await bucket.acquire()
+        try:
+            async with session.get(url, headers=headers or {}) as resp:
+                if resp.status<400:
+                    if bucket and resp.headers.get("X-RateLimit-Remaining") == "0":
+                        bucket.penalize(_retry_after(resp) or 1.0)
+                    return await resp.read()
+                if resp.status not in _RETRY_STATUS:
+                    return None
+                if resp.status == 429:
+                    delay = _retry_after(resp)
+                    if delay is not None:
+                        if bucket: bucket.penalize(delay)
+                        if attempt < _RETRY_TOTAL:
+                            await asyncio.sleep(delay)
+                            continue
+        except Exception:
+            pass
+        if attempt < _RETRY_TOTAL:
+            await asyncio.sleep(0.5 * (2 ** attempt))
+    return None
 
-def hunter_emails(domain: str, limit:int=10)->List[str]:
+# Both fetchers return None on failure (missing key, exhausted retries,
+# unparseable body) and a real — possibly empty — result on success, so the
+# cache layer can tell "retry later" apart from "this domain has no data".
+async def hunter_emails(session: "aiohttp.ClientSession", domain: str, limit:int=10)->Optional[List[str]]:
     key=os.environ.get("HUNTER_API_KEY") or ""
-    if not key: return []
+    if not key: return None
     url="https://api.hunter.io/v2/domain-search?" + urllib.parse.urlencode({"domain":domain,"api_key":key,"limit":limit})
-    data=http_get(url, headers={"Accept":"application/json"})
-    if not data: return []
+    data=await http_get(session, url, headers={"Accept":"application/json"}, bucket=_HUNTER_BUCKET)
+    if not data: return None
     try:
-        js=json.loads(data.decode("utf-8","ignore"))
+        js=_loads_bytes(data)
         out=[]
         for e in js.get("data",{}).get("emails",[]) or []:
             val=e.get("value")
             if val and is_valid_email(val):
                 out.append(val)
         return list(dict.fromkeys(out))
-    except: return []
+    except: return None
 
-def clearbit_linkedin(domain: str)->str:
+async def clearbit_linkedin(session: "aiohttp.ClientSession", domain: str)->Optional[str]:
     key=os.environ.get("CLEARBIT_API_KEY") or ""
-    if not key: return ""
+    if not key: return None
     url="https://company.clearbit.com/v2/companies/find?domain=" + urllib.parse.quote(domain)
-    data=http_get(url, headers={"Authorization": f"Bearer {key}", "Accept":"application/json"})
-    if not data: return ""
+    data=await http_get(session, url, headers={"Authorization": f"Bearer {key}", "Accept":"application/json"}, bucket=_CLEARBIT_BUCKET)
+    if not data: return None
     try:
-        js=json.loads(data.decode("utf-8","ignore"))
+        js=_loads_bytes(data)
         site = js.get("site",{}) if isinstance(js,dict) else {}
         return site.get("linkedin") or ""
-    except: return ""
+    except: return None
+
+_GUESS_DOMAIN_RE = re.compile(r"[A-Za-z0-9.\-]+\.[A-Za-z]{2,}")
 
 def guess_patterns(first: str, last: str, domain: str)->List[str]:
-    pats = ["{f}{last}@{d}","{first}.{last}@{d}","{first}{l}@{d}","{first}@{d}","{first}_{last}@{d}","{f}.{last}@{d}","{first}{last}@{d}"]
+    # the seven patterns are spelled out as f-strings (compiled to BUILD_STRING
+    # bytecode) instead of str.format, which reparses its template every call
     first_l=(first or "").lower(); last_l=(last or "").lower()
-    f=first_l[:1]; l=last_l[:1]
-    outs=[]
-    for p in pats:
-        e=p.format(f=f,l=l,first=first_l,last=last_l,d=domain)
-        if is_valid_email(e): outs.append(e)
-    return list(dict.fromkeys(outs))
+    f=first_l[:1]; l=last_l[:1]; d=domain
+    if not _GUESS_DOMAIN_RE.fullmatch(d or ""):
+        return []
+    candidates = [
+        f"{f}{last_l}@{d}",
+        f"{first_l}.{last_l}@{d}",
+        f"{first_l}{l}@{d}",
+        f"{first_l}@{d}",
+        f"{first_l}_{last_l}@{d}",
+        f"{f}.{last_l}@{d}",
+        f"{first_l}{last_l}@{d}",
+    ]
+    if first_l and last_l:
+        # split_name only emits [A-Za-z]+ tokens, so with both name parts
+        # present every candidate is valid by construction: one domain match
+        # above replaces seven full-address regex matches per contact
+        return list(dict.fromkeys(candidates))
+    return list(dict.fromkeys(e for e in candidates if is_valid_email(e)))
+
+# one findall pass replaces the per-call re.sub + split; titles excluded
+# via a frozenset instead of a tuple scan
+_TOKEN_RE = re.compile(r"[A-Za-z]+")
+_TITLES = frozenset({"mr","mrs","ms","md","dr","sir","shri","sri"})
 
 def split_name(name: str)->Tuple[str,str]:
-    if not name: return ("","")
-    name=re.sub(r"[^A-Za-z\s\.]"," ",name)
-    toks=[t for t in name.split() if t.lower() not in ("mr","mrs","ms","md","dr","sir","shri","sri")]
+    toks=[t for t in _TOKEN_RE.findall(name or "") if t.lower() not in _TITLES]
     if not toks: return ("","")
     if len(toks)==1: return (toks[0].title(),"")
     return (toks[0].title(), toks[-1].title())
 
-def run():
+def _skip_hunter(email: str, dom: str)->bool:
+    # A validated corporate email on the row's own domain already answers
+    # what Hunter would; skip the call (and its quota) in that case. Shared
+    # by _fetch_row and the batch prewarm so they agree on who needs Hunter.
+    return bool(email and is_valid_email(email)
+                and email.split("@")[-1].lower() == dom and dom not in FREE_MAIL)
+
+async def _fetch_row(session: "aiohttp.ClientSession", r: Dict[str,str])->Tuple[Dict[str,str],List[str],str,Optional[str]]:
+    """I/O half of row enrichment: gather candidate emails and LinkedIn via
+    the per-domain caches. Returns the arguments for _finalize_row."""
+    web=r.get("Website",""); dom = domain_of(web) if web else None
+    li = r.get("LinkedIn URL","").strip()
+    email=r.get("Email","").strip()
+    enriched = [email] if email else []
+    if dom and not _skip_api(dom):
+        if not _skip_hunter(email, dom):
+            # Hunter (memoized per domain)
+            for e in await _cached(_HUNTER_CACHE, dom, lambda: hunter_emails(session, dom, limit=10)) or []:
+                if is_valid_email(e) and not e.lower().endswith(AT_DIRECTORY):
+                    enriched.append(e)
+        # Guess from contact name, unless we already hold enough real
+        # addresses on this domain to make guesses noise
+        at_dom = "@"+dom
+        if sum(1 for e in enriched if e.lower().endswith(at_dom)) < 3:
+            fn, ln = split_name(r.get("Contact Person","") or "")
+            if fn or ln:
+                for e in guess_patterns(fn, ln, dom):
+                    if not e.lower().endswith(AT_DIRECTORY):
+                        enriched.append(e)
+        # LinkedIn if missing (memoized per domain)
+        if not li:
+            li = await _cached(_CLEARBIT_CACHE, dom, lambda: clearbit_linkedin(session, dom)) or ""
+    return r, enriched, li, dom
+
+def _finalize_row(r: Dict[str,str], enriched: List[str], li: str, dom: Optional[str])->Dict[str,str]:
+    """CPU half of row enrichment: dedupe, rank and patch the row dict.
+    Module-level and free of session/loop state so it pickles to workers."""
+    # rank enriched: set-backed dedupe in one pass, then an in-place stable
+    # sort that puts own-domain addresses first and free-mail ones last
+    seen: Set[str] = set(); uniq=[]
+    for e in enriched:
+        if e and e not in seen and is_valid_email(e): seen.add(e); uniq.append(e)
+    if dom:
+        # Schwartzian transform: split/lower each address's domain exactly
+        # once and let both sort legs read the cached value
+        decorated = [(e.rsplit("@",1)[-1].lower(), e) for e in uniq]
+        decorated.sort(key=lambda t: (t[0] != dom, t[0] in FREE_MAIL))
+        uniq = [e for _, e in decorated]
+
+    # the input row already carries the 13-column schema; copy it and patch
+    # only the enriched fields instead of rebuilding the dict key by key
+    r_email = r.get("Email","")
+    row = dict(r)
+    row["Email"] = uniq[0] if uniq else r_email
+    row["LinkedIn URL"] = li
+    row["Enriched Emails"] = ", ".join(uniq) or r_email
+    return row
+
+def _finalize_batch(items)->List[Dict[str,str]]:
+    # whole batches cross the process boundary in one pickle round trip;
+    # per-row submission would cost more in IPC than the work itself
+    return [_finalize_row(*it) for it in items]
+
+# Below this many input rows the dedup/sort tail is too cheap to justify
+# worker processes; above it, batches are finalized on a ProcessPoolExecutor.
+ENRICH_PROC_THRESHOLD = int(os.environ.get("ENRICH_PROC_THRESHOLD","20000"))
+
+_CACHE_LOOP: Optional["asyncio.AbstractEventLoop"] = None
+
+async def run_async(inp: Optional[str]=None, out_csv: Optional[str]=None):
+    """Enrich `inp` (default: newest export) into `out_csv`. Callers may run
+    several shard CSVs concurrently on one loop; the domain caches are shared
+    between them."""
+    global _CACHE_LOOP
     script_dir=os.path.dirname(os.path.abspath(__file__))
     base_dir=os.path.dirname(script_dir)
     load_env(os.path.join(base_dir,".env"))
     exports=os.path.join(base_dir,"Exports"); safe_mkdir(exports)
-    inp=latest_csv(exports)
+    inp = inp or latest_csv(exports)
     if not inp:
         print("No CSV in Exports. Run scraper first."); return
-    rows=read_rows(inp)
-    out=[]
-    for r in rows:
-        web=r.get("Website",""); dom = domain_of(web) if web else None
-        li = r.get("LinkedIn URL","").strip()
-        email=r.get("Email","").strip()
-        enriched = [email] if email else []
-        if dom and not any(dom.endswith(d) for d in DIRECTORY_DOMAINS):
-            # Hunter
-            for e in hunter_emails(dom, limit=10):
-                if is_valid_email(e) and not any(e.lower().endswith("@"+d) for d in DIRECTORY_DOMAINS):
-                    enriched.append(e)
-            # Guess from contact name
-            fn, ln = split_name(r.get("Contact Person","") or "")
-            if fn or ln:
-                for e in guess_patterns(fn, ln, dom):
-                    if not any(e.lower().endswith("@"+d) for d in DIRECTORY_DOMAINS):
-                        enriched.append(e)
-            # LinkedIn if missing
-            if not li:
-                li = clearbit_linkedin(dom) or ""
-
-        # rank enriched
-        uniq=[]
-        for e in enriched:
-            if e and e not in uniq and is_valid_email(e): uniq.append(e)
-        if dom:
-            uniq = sorted(uniq, key=lambda x: (x.split("@")[-1].lower()==dom and 1 or 0, x not in FREE_MAIL), reverse=True)
-
-        out.append({
-            "ID": r.get("ID",""),
-            "Company Name": r.get("Company Name",""),
-            "Contact Person": r.get("Contact Person",""),
-            "Email": uniq[0] if uniq else r.get("Email",""),
-            "Phone": r.get("Phone",""),
-            "Website": web,
-            "Industry": r.get("Industry",""),
-            "Location": r.get("Location",""),
-            "Company Type": r.get("Company Type",""),
-            "Source": r.get("Source",""),
-            "Date": r.get("Date",""),
-            "LinkedIn URL": li,
-            "Enriched Emails": ", ".join(uniq) if uniq else (r.get("Email","") or "")
-        })
-    ts=datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_csv=os.path.join(exports, f"b2b_leads_enriched_{ts}.csv")
-    write_rows(out_csv, out)
+    cache_dir=os.path.join(base_dir,"Cache"); safe_mkdir(cache_dir)
+    cache_db = _open_cache_db(cache_dir)
+    loop = asyncio.get_running_loop()
+    if _CACHE_LOOP is not loop:
+        # Futures are bound to one loop; rehydrate from disk when this is a
+        # fresh loop (concurrent shard runs on the same loop share the caches)
+        for c in (_HUNTER_CACHE,_CLEARBIT_CACHE,_HUNTER_TS,_CLEARBIT_TS): c.clear()
+        _load_cache_db(cache_db, "hunter", "emails", _HUNTER_CACHE, _HUNTER_TS, json.loads)
+        _load_cache_db(cache_db, "clearbit", "linkedin", _CLEARBIT_CACHE, _CLEARBIT_TS, lambda v: v or "")
+        _CACHE_LOOP = loop
+    sem = asyncio.Semaphore(ENRICH_CONCURRENCY)
+    done = _previous_enriched(exports) if ENRICH_INCREMENTAL else {}
+    if not out_csv:
+        ts=datetime.now().strftime("%Y%m%d_%H%M%S")
+        out_csv=os.path.join(exports, f"b2b_leads_enriched_{ts}.csv")
+
+    # spin up finalizer processes only when the input is big enough for the
+    # CPU tail (validate/dedupe/sort) to matter; one buffered byte pass
+    # counts the rows
+    with open(inp,"rb") as f:
+        total_rows = sum(buf.count(b"\n") for buf in iter(lambda: f.read(1<<20), b"")) - 1
+    pool = ProcessPoolExecutor(max_workers=os.cpu_count()) if total_rows >= ENRICH_PROC_THRESHOLD else None
+
+    async def worker(r: Dict[str,str]):
+        async with sem:
+            return await _fetch_row(session, r)
+
+    async def prewarm(dom: str):
+        # one Hunter fetch per unique domain; rows sharing the domain then
+        # resolve from the cache instead of queueing behind each other
+        async with sem:
+            await _cached(_HUNTER_CACHE, dom, lambda: hunter_emails(session, dom, limit=10))
+
+    async with aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=12),
+        connector=aiohttp.TCPConnector(limit=50),
+        headers={"User-Agent": f"{APP}/1.0"},
+    ) as session:
+        with open(inp,"r",encoding="utf-8") as fin, open(out_csv,"w",newline="",encoding="utf-8") as fout:
+            # plain reader/writer + dict(zip(...)) instead of DictReader/
+            # DictWriter: field splitting and row assembly stay in C
+            reader = csv.reader(fin)
+            header = next(reader, [])
+            w = csv.writer(fout); w.writerow(HEADERS)
+            batch: List[Dict[str,str]] = []
+
+            async def flush_batch():
+                # rows already present in the previous enriched CSV are reused
+                # verbatim; only novel keys go through enrichment
+                results = [done.get((r.get("Company Name",""), r.get("Website",""))) if done else None
+                           for r in batch]
+                pending = [i for i, res in enumerate(results) if res is None]
+                # enrich each unique domain of the novel rows exactly once up
+                # front, then fan the cached results back row by row; domains
+                # whose rows all short-circuit Hunter stay out of the prewarm,
+                # otherwise it would fire the very call _skip_hunter avoids
+                doms = set()
+                for i in pending:
+                    r = batch[i]
+                    d = domain_of(r.get("Website","") or "")
+                    if d and not _skip_api(d) and not _skip_hunter(r.get("Email","").strip(), d):
+                        doms.add(d)
+                await asyncio.gather(*(prewarm(d) for d in doms))
+                # gather preserves argument order, so rows are written in
+                # input order no matter which enrichment finishes first
+                fetched = await asyncio.gather(*(worker(batch[i]) for i in pending))
+                if pool is not None:
+                    finals = await loop.run_in_executor(pool, _finalize_batch, fetched)
+                else:
+                    finals = _finalize_batch(fetched)
+                for i, res in zip(pending, finals):
+                    results[i] = res
+                for res in results:
+                    w.writerow([res.get(h,"") for h in HEADERS])
+                batch.clear()
+
+            for row in reader:
+                batch.append(dict(zip(header, row)))
+                if len(batch) >= _BATCH_ROWS:
+                    await flush_batch()
+            if batch:
+                await flush_batch()
+
+    if pool is not None:
+        pool.shutdown()
+    _save_cache_db(cache_db, "hunter", "emails", _HUNTER_CACHE, _HUNTER_TS, json.dumps)
+    _save_cache_db(cache_db, "clearbit", "linkedin", _CLEARBIT_CACHE, _CLEARBIT_TS, lambda v: v or "")
+    cache_db.close()
     print(f"Enriched CSV: {out_csv}")
 
+def run():
+    asyncio.run(run_async())
+
 if __name__=="__main__":
     run()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+utils_fast.py
+
+Hot string helpers shared by both scraper variants. These run thousands of
+times per scrape, so they are kept fully type-annotated, dependency-light and
+free of module state: the file compiles as-is with mypyc/Cython for a drop-in
+C-extension speedup, with pure Python as the default.
+"""
+
+import re
+import urllib.parse
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Optional, Set
+
+try:
+    from rapidfuzz import fuzz as _rf_fuzz  # C++ scorer, ~50x SequenceMatcher
+except ImportError:
+    _rf_fuzz = None
+
+FREE_MAIL: Set[str] = {
+    "gmail.com","yahoo.com","outlook.com","hotmail.com","rediffmail.com","live.com","icloud.com",
+    "aol.com","proton.me","protonmail.com","yandex.com","zoho.com","gmx.com"
+}
+
+TITLE_SPLIT_RE = re.compile(r"[-|–|:|•|,]")
+_TITLE_NOISE_RE = re.compile(r"\b(Indiamart|IndiaMART|Justdial|TradeIndia)\b.*$", re.I)
+_EMAIL_FULL_RE = re.compile(r"^[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}$")
+
+
+# Multi-label public suffixes this scraper actually meets; enough to compute
+# a registrable domain without shipping the full public-suffix list.
+_SECOND_LEVEL_TLDS: Set[str] = {
+    "co.in","net.in","org.in","gen.in","firm.in","ind.in","ac.in","edu.in","gov.in","nic.in","res.in",
+    "co.uk","org.uk","ac.uk","gov.uk","com.au","net.au","org.au","co.nz",
+    "com.sg","com.my","co.jp","com.cn","com.hk","co.za","com.br",
+}
+
+
+@lru_cache(maxsize=4096)
+def etld1(url: str) -> Optional[str]:
+    """Registrable domain (eTLD+1) of a URL: foo.bar.co.in -> bar.co.in."""
+    host = domain_of(url)
+    if not host: return None
+    parts = host.split(".")
+    if len(parts) <= 2: return host
+    if ".".join(parts[-2:]) in _SECOND_LEVEL_TLDS:
+        return ".".join(parts[-3:])
+    return ".".join(parts[-2:])
+
+
+# SERP batches repeat the same hosts heavily; caching skips the urlparse cost.
+@lru_cache(maxsize=4096)
+def domain_of(url: str) -> Optional[str]:
+    try:
+        host = urllib.parse.urlparse(url).netloc.lower()
+        return host[4:] if host.startswith("www.") else host
+    except: return None
+
+
+def is_valid_url(u: str) -> bool:
+    try:
+        p = urllib.parse.urlparse(u)
+        return p.scheme in ("http","https") and "." in (p.netloc or "")
+    except: return False
+
+
+def is_valid_email(e: str) -> bool:
+    if not e: return False
+    return bool(_EMAIL_FULL_RE.match(e.strip()))
+
+
+def rank_email(email: str, site_dom: Optional[str]) -> int:
+    if not is_valid_email(email): return 0
+    dom = email.split("@")[-1].lower()
+    if site_dom and dom == site_dom: return 3
+    if dom in FREE_MAIL: return 1
+    return 2
+
+
+def norm_text(s: str) -> str:
+    return " ".join(sorted(s.lower().split()))
+
+
+def fuzzy_sim_norm(a: str, b: str) -> float:
+    """Like fuzzy_sim but operands must already be norm_text()-normalized."""
+    if _rf_fuzz is not None:
+        return _rf_fuzz.ratio(a, b) / 100.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def fuzzy_sim(a: str, b: str) -> float:
+    return fuzzy_sim_norm(norm_text(a), norm_text(b))
+
+
+def title_head(s: str) -> str:
+    if not s: return ""
+    t = TITLE_SPLIT_RE.split(s)[0].strip()
+    return _TITLE_NOISE_RE.sub("", t).strip()
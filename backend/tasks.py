@@ -1,11 +1,12 @@
-import os, sys, asyncio
+import os, sys, time, asyncio
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
+import orjson
 from rq import get_current_job
 
 from .settings import EXPORT_BASE, DOTENV_PATH
-from .utils import ensure_task_dir, latest_by_glob, copy_if_exists, make_task_manifest, now_iso
+from .utils import ensure_task_dir, latest_by_glob, copy_if_exists, load_dotenv, make_task_manifest, merge_csvs, now_iso
 
 THIS_DIR = Path(__file__).resolve().parent
 SCRAPER_DIR = THIS_DIR / "scraper_scripts"
@@ -13,23 +14,26 @@ sys.path.insert(0, str(SCRAPER_DIR))
 
 from b2b_lead_scraper_async import Scraper as AsyncScraper  # type: ignore
 from contact_enricher_asyncsafe import run as run_enricher  # type: ignore
-
-def _load_dotenv():
-    if DOTENV_PATH.exists():
-        for line in DOTENV_PATH.read_text(encoding="utf-8").splitlines():
-            s = line.strip()
-            if not s or s.startswith("#") or "=" not in s:
-                continue
-            k, v = s.split("=", 1)
-            os.environ.setdefault(k.strip(), v.strip().strip('"').strip("'"))
+from contact_enricher_asyncsafe import run_async as run_enricher_async  # type: ignore
+
+def _publish_progress(job, phase: str, progress: str = "") -> None:
+    # Pushed to subscribers of the SSE endpoint; best-effort only.
+    try:
+        job.connection.publish(
+            f"scrape:{job.get_id()}",
+            orjson.dumps({"phase": phase, "progress": progress}),
+        )
+    except Exception:
+        pass
 
 def run_scrape_job(payload: Dict[str, Any]) -> Dict[str, Any]:
     job = get_current_job()
     if job:
         job.meta.update({"phase": "starting", "started_at": now_iso()})
         job.save_meta()
+        _publish_progress(job, "starting")
 
-    _load_dotenv()
+    load_dotenv(DOTENV_PATH)
 
     base_dir = SCRAPER_DIR.parent
     exports_dir = base_dir / "Exports"
@@ -51,18 +55,46 @@ def run_scrape_job(payload: Dict[str, Any]) -> Dict[str, Any]:
     if job:
         job.meta.update({"phase": "scraping", "progress": "SERP & site crawl"})
         job.save_meta()
+        _publish_progress(job, "scraping", "SERP & site crawl")
 
     scraper = AsyncScraper(str(base_dir), args)
-    asyncio.run(scraper.run(locs, kws))
+    shard_outputs: List[str] = []
+
+    async def _pipeline():
+        # Each finished combo is enriched while later combos still scrape,
+        # overlapping the Hunter/Clearbit latency with the crawl.
+        shard_tasks: List[asyncio.Task] = []
+
+        def on_combo(shard_csv: str):
+            out = shard_csv[:-4] + "_enriched.csv"
+            shard_outputs.append(out)
+            shard_tasks.append(asyncio.create_task(run_enricher_async(shard_csv, out)))
+
+        await scraper.run(locs, kws, on_combo=on_combo)
+        if job:
+            job.meta.update({"phase": "enriching", "progress": "Hunter/Clearbit"})
+            job.save_meta()
+            _publish_progress(job, "enriching", "Hunter/Clearbit")
+        if shard_tasks:
+            # one failed shard must not fail a finished scrape: its enriched
+            # CSV never appears, merge_csvs skips it, and the serial fallback
+            # below covers the nothing-merged case
+            for res in await asyncio.gather(*shard_tasks, return_exceptions=True):
+                if isinstance(res, BaseException):
+                    print(f"shard enrichment failed: {res}", file=sys.stderr)
+
+    asyncio.run(_pipeline())
 
     latest_csv = latest_by_glob(exports_dir, "b2b_leads_*.csv")
     latest_xlsx = latest_by_glob(exports_dir, "b2b_leads_*.xlsx")
 
-    if job:
-        job.meta.update({"phase": "enriching", "progress": "Hunter/Clearbit"})
-        job.save_meta()
-
-    run_enricher()  # writes b2b_leads_enriched_*.csv into Exports
+    merged = None
+    if shard_outputs:
+        ts = time.strftime("%Y%m%d_%H%M%S")
+        merged = merge_csvs(shard_outputs, exports_dir / f"b2b_leads_enriched_{ts}.csv")
+    if merged is None:
+        # no combo produced a shard (e.g. zero accepted rows): old serial path
+        run_enricher()  # writes b2b_leads_enriched_*.csv into Exports
 
     latest_enriched_csv = latest_by_glob(exports_dir, "b2b_leads_enriched_*.csv")
 
@@ -91,5 +123,6 @@ def run_scrape_job(payload: Dict[str, Any]) -> Dict[str, Any]:
     if job:
         job.meta.update({"phase": "completed", "progress": "done", "outputs": manifest["outputs"]})
         job.save_meta()
+        _publish_progress(job, "completed", "done")
 
     return manifest
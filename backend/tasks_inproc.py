@@ -1,9 +1,9 @@
-import os, sys, asyncio
+import os, sys, asyncio, time
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Callable
 
 from .settings import EXPORT_BASE, DOTENV_PATH
-from .utils import ensure_task_dir, latest_by_glob, copy_if_exists, make_task_manifest, now_iso
+from .utils import ensure_task_dir, latest_by_glob, copy_if_exists, load_dotenv, make_task_manifest, merge_csvs, now_iso
 
 THIS_DIR = Path(__file__).resolve().parent
 SCRAPER_DIR = THIS_DIR / "scraper_scripts"
@@ -12,16 +12,40 @@ sys.path.insert(0, str(SCRAPER_DIR))
 # Use the in-project async scraper and safe enricher
 from b2b_lead_scraper import Scraper as AsyncScraper  # type: ignore
 from contact_enricher_asyncsafe import run as run_enricher  # type: ignore
+from contact_enricher_asyncsafe import run_async as run_enricher_async  # type: ignore
 
 
-def _load_dotenv():
-    if DOTENV_PATH.exists():
-        for line in DOTENV_PATH.read_text(encoding="utf-8").splitlines():
-            s = line.strip()
-            if not s or s.startswith("#") or "=" not in s:
-                continue
-            k, v = s.split("=", 1)
-            os.environ.setdefault(k.strip(), v.strip().strip('"').strip("'"))
+# Each Manager-proxy update is a full IPC round trip; coalescing bursty
+# progress into this window keeps chatty scrapers from thrashing it.
+_PROGRESS_FLUSH_SEC = 0.05
+
+
+def run_scrape_job_proc(task_id: str, payload: Dict[str, Any], shared) -> Dict[str, Any]:
+    """Entry point for ProcessPoolExecutor: progress goes into a
+    multiprocessing.Manager dict proxy instead of a callback closure
+    (which cannot cross the process boundary)."""
+    last_flush = [0.0]
+    latest: Dict[str, str] = {}
+
+    def flush():
+        if latest:
+            shared.update({"status": latest["phase"], "phase": latest["phase"],
+                           "progress": latest["progress"]})
+            last_flush[0] = time.monotonic()
+
+    def cb(phase: str, progress: str):
+        # Phase transitions always flush (the UI depends on them); same-phase
+        # progress churn is buffered and flushed at most once per window.
+        transition = phase != latest.get("phase")
+        latest["phase"] = phase
+        latest["progress"] = progress
+        if transition or time.monotonic() - last_flush[0] > _PROGRESS_FLUSH_SEC:
+            flush()
+
+    try:
+        return run_scrape_job_inproc(task_id, payload, progress_cb=cb)
+    finally:
+        flush()
 
 
 def run_scrape_job_inproc(
@@ -39,7 +63,7 @@ def run_scrape_job_inproc(
                 pass
 
     set_status("starting", "init")
-    _load_dotenv()
+    load_dotenv(DOTENV_PATH)
 
     base_dir = SCRAPER_DIR.parent
     exports_dir = base_dir / "Exports"
@@ -61,15 +85,42 @@ def run_scrape_job_inproc(
 
     set_status("scraping", "SERP & site crawl")
     scraper = AsyncScraper(str(base_dir), args)
-    # Run and let the scraper write CSV/XLSX for THIS batch only
-    asyncio.run(scraper.run(locs, kws))
+    shard_outputs: List[str] = []
+
+    async def _pipeline():
+        # Each finished combo is enriched while later combos still scrape,
+        # overlapping the Hunter/Clearbit latency with the crawl.
+        shard_tasks: List[asyncio.Task] = []
+
+        def on_combo(shard_csv: str):
+            out = shard_csv[:-4] + "_enriched.csv"
+            shard_outputs.append(out)
+            shard_tasks.append(asyncio.create_task(run_enricher_async(shard_csv, out)))
+
+        # Run and let the scraper write CSV/XLSX for THIS batch only
+        await scraper.run(locs, kws, on_combo=on_combo)
+        set_status("enriching", "Hunter/Clearbit")
+        if shard_tasks:
+            # one failed shard must not fail a finished scrape: its enriched
+            # CSV never appears, merge_csvs skips it, and the serial fallback
+            # below covers the nothing-merged case
+            for res in await asyncio.gather(*shard_tasks, return_exceptions=True):
+                if isinstance(res, BaseException):
+                    print(f"shard enrichment failed: {res}", file=sys.stderr)
+
+    asyncio.run(_pipeline())
 
     # Grab the most recent files (created by the run above)
     latest_csv = latest_by_glob(exports_dir, "b2b_leads_*.csv")
     latest_xlsx = latest_by_glob(exports_dir, "b2b_leads_*.xlsx")
 
-    set_status("enriching", "Hunter/Clearbit")
-    run_enricher()  # writes enriched CSV using the latest CSV
+    merged = None
+    if shard_outputs:
+        ts = time.strftime("%Y%m%d_%H%M%S")
+        merged = merge_csvs(shard_outputs, exports_dir / f"b2b_leads_enriched_{ts}.csv")
+    if merged is None:
+        # no combo produced a shard (e.g. zero accepted rows): old serial path
+        run_enricher()  # writes enriched CSV using the latest CSV
 
     latest_enriched_csv = latest_by_glob(exports_dir, "b2b_leads_enriched_*.csv")
 
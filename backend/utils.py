@@ -1,10 +1,30 @@
+import os
+import re
 import shutil
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+# KEY=value with optional quotes and trailing comments, matched over the
+# whole file in one C-level pass instead of a Python loop per line.
+_DOTENV_RE = re.compile(rb"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(?:\"([^\"\n]*)\"|'([^'\n]*)'|([^\n#]*))", re.M)
+
+def load_dotenv(path: Path) -> None:
+    """Apply a .env file to os.environ (setdefault semantics).
+
+    Shared by tasks.py and tasks_inproc.py, which previously carried
+    duplicate line-by-line parsers."""
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return
+    for m in _DOTENV_RE.finditer(data):
+        v = m.group(2) or m.group(3) or m.group(4) or b""
+        os.environ.setdefault(m.group(1).decode(), v.strip().decode())
+
 def latest_by_glob(dirpath: Path, pattern: str) -> Optional[Path]:
-    files = sorted(dirpath.glob(pattern))
-    return files[-1] if files else None
+    # newest by mtime in one O(N) pass over the glob generator; no sorted
+    # list of every historical export is ever materialized
+    return max(dirpath.glob(pattern), default=None, key=lambda p: p.stat().st_mtime)
 
 def ensure_task_dir(base: Path, task_id: str) -> Path:
     p = base / task_id
@@ -13,15 +33,67 @@ def ensure_task_dir(base: Path, task_id: str) -> Path:
 
 def copy_if_exists(src: Optional[Path], dst: Path) -> Optional[Path]:
     if src and src.exists():
-        shutil.copy2(src, dst)
+        # hardlink when src and dst share a filesystem: O(1) metadata, zero
+        # bytes copied; otherwise fall back to a normal copy (shutil uses
+        # the kernel fast path where the platform offers one)
+        dst.unlink(missing_ok=True)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
         return dst
     return None
 
+def merge_csvs(paths, dst: Path) -> Optional[Path]:
+    """Concatenate CSV shards sharing a header into dst, renumbering the ID
+    column. Returns dst, or None when no shard contributed a row."""
+    import csv
+    header = None
+    n = 0
+    with open(dst, "w", newline="", encoding="utf-8") as fout:
+        w = csv.writer(fout)
+        for p in paths:
+            try:
+                f = open(p, "r", encoding="utf-8")
+            except OSError:
+                continue
+            with f:
+                r = csv.reader(f)
+                h = next(r, None)
+                if h is None:
+                    continue
+                if header is None:
+                    header = h
+                    w.writerow(h)
+                for row in r:
+                    if not row:
+                        continue
+                    n += 1
+                    if header and header[0] == "ID":
+                        row[0] = str(n)
+                    w.writerow(row)
+    if n == 0:
+        dst.unlink(missing_ok=True)
+        return None
+    return dst
+
 def make_task_manifest(task_dir: Path, meta: Dict[str, Any]) -> None:
-    (task_dir / "manifest.json").write_text(
-        __import__("json").dumps(meta, indent=2), encoding="utf-8"
+    # orjson emits UTF-8 bytes, so they go straight to write_bytes with no
+    # encode step; already a hard dependency via tasks.py
+    import orjson
+    (task_dir / "manifest.json").write_bytes(
+        orjson.dumps(meta, option=orjson.OPT_INDENT_2)
     )
 
 def now_iso() -> str:
     from datetime import datetime, timezone
     return datetime.now(timezone.utc).astimezone().isoformat()
+
+def new_task_id() -> str:
+    """ULID-style 32-hex id: 48-bit ms timestamp prefix + 80 random bits.
+
+    Time-sortable ids keep rq:job:<id> keys clustered by creation time,
+    which makes prefix SCANs ("jobs from the last hour") cheap.
+    """
+    import time, secrets
+    return f"{int(time.time() * 1000) & 0xFFFFFFFFFFFF:012x}{secrets.token_hex(10)}"